@@ -1,51 +1,113 @@
 # backend/app.py
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request, has_request_context, g
 from flask_cors import CORS
 from config import Config
-import pymysql
+import logging
+import os
+import time
+import db
+import logging_config
+import outbox
+import profiler
+import query_builder
+import tenants
 
 # ------------------------
 # Initialize Flask app
 # ------------------------
 app = Flask(__name__)
 app.config.from_object(Config)
-CORS(app, resources={r"/*": {"origins": "*"}})
+# Read-your-writes across worker processes: responses to requests that
+# committed carry the write time, and the client sends it back on reads
+LAST_WRITE_HEADER = 'X-Last-Write'
+
+CORS(app, resources={r"/*": {"origins": "*"}},
+     expose_headers=[logging_config.REQUEST_ID_HEADER, LAST_WRITE_HEADER])
+logging_config.init_app(app)
+profiler.init_app(app)
+
+logger = logging.getLogger(__name__)
 
 # ------------------------
 # Database connection helper
 # ------------------------
-def get_db_connection():
+def get_db_connection(readonly=False, tenant=None):
+    """
+    Pooled connection to a tenant's database; conn.close() hands it back
+    to the pool. The tenant defaults to the authenticated request's.
+    readonly=True lets the query run on a read replica.
+    """
     try:
-        conn = pymysql.connect(
-            host="localhost",
-            user="root",
-            password="8897",
-            database="employee_db",
-            cursorclass=pymysql.cursors.DictCursor,
-            port=3306
+        return db.get_router().acquire(
+            readonly=readonly,
+            session=current_session(),
+            tenant=tenant or tenants.current_tenant(),
+            last_write_at=client_last_write(),
+            on_commit=_note_write
         )
-        return conn
+    except db.TenantBusy:
+        # Not a connection failure: the request is answered with a 503
+        raise
     except Exception as e:
-        print("❌ Database connection failed:", e)
+        logger.warning('Database connection failed', extra={
+            'event': 'db.connect_failed', 'error': str(e)
+        })
+        return None
+
+def current_session():
+    """Read-your-writes scope: the authenticated user (within its tenant), if any"""
+    if has_request_context() and hasattr(request, 'user'):
+        return (tenants.current_tenant(), request.user.get('user_id'))
+    return None
+
+def client_last_write():
+    """Time of the session's last write as echoed by the client, if any"""
+    if not has_request_context():
+        return None
+    try:
+        return float(request.headers[LAST_WRITE_HEADER])
+    except (KeyError, ValueError):
         return None
 
+def _note_write():
+    if has_request_context():
+        g.last_write_at = time.time()
+
+@app.after_request
+def send_last_write(response):
+    if 'last_write_at' in g:
+        response.headers[LAST_WRITE_HEADER] = f'{g.last_write_at:.3f}'
+    return response
+
 # Optional: test connection on app start
-conn = get_db_connection()
+conn = get_db_connection(tenant=tenants.all_tenants()[0])
 if conn:
-    print("✅ Database connected successfully!")
+    logger.info('Database connected successfully')
     conn.close()
 else:
-    print("❌ Could not connect to database!")
+    logger.error('Could not connect to database')
+
+@app.errorhandler(db.TenantBusy)
+def tenant_busy(e):
+    return logging_config.error_response(e)
 
 # ------------------------
 # Import and register blueprints
 # ------------------------
 # Adjust imports for running inside backend folder
 from auth import auth_bp
-from employees import employees_bp  # <- changed import
+from employees import employees_bp, employees_flight, require_operator  # <- changed import
+from bulk_import import import_bp
+from archive import archive_bp
+from timeseries import timeseries_bp
+from profiler import profile_bp
 
 app.register_blueprint(auth_bp)
 app.register_blueprint(employees_bp)
+app.register_blueprint(import_bp)
+app.register_blueprint(archive_bp)
+app.register_blueprint(timeseries_bp)
+app.register_blueprint(profile_bp)
 
 # ------------------------
 # Basic routes
@@ -60,28 +122,56 @@ def home():
             'GET /': 'API information',
             'GET /health': 'Health check',
             'GET /test-db': 'Database connection test',
+            'GET /metrics': 'Runtime metrics',
             'POST /api/auth/login': 'Login',
             'GET /api/auth/verify': 'Verify token',
             'GET /api/employees': 'Get all employees',
             'GET /api/employees/<id>': 'Get single employee',
+            'GET /api/employees/batch?ids=1,2,3': 'Get several employees by ID',
             'POST /api/employees': 'Create employee',
             'PUT /api/employees/<id>': 'Update employee',
             'DELETE /api/employees/<id>': 'Delete employee',
-            'GET /api/employees/stats': 'Get statistics'
+            'GET /api/employees/stats': 'Get statistics',
+            'POST /api/employees/import': 'Bulk import employees from CSV/XLSX',
+            'GET /api/employees/import/<job_id>': 'Import progress',
+            'GET /api/employees/import/<job_id>/errors': 'Import error report (CSV)',
+            'POST /api/employees/archive': 'Archive long-inactive employees',
+            'GET /api/employees/archive': 'Last archival run',
+            'POST /api/employees/archive/<id>/restore': 'Restore archived employee',
+            'GET /api/employees/timeseries': 'Hires, exits and headcount over time',
+            'POST /api/employees/timeseries/rebuild': 'Rebuild time series buckets',
+            'POST /api/admin/profile': 'Start a sampling profiler session',
+            'GET /api/admin/profile': 'Profile result (collapsed stacks, allocations)',
+            'DELETE /api/admin/profile': 'Stop the profiler session'
         }
     })
 
 @app.route('/health')
 def health():
-    conn = get_db_connection()
+    conn = get_db_connection(tenant=tenants.all_tenants()[0])
     db_status = 'connected' if conn else 'disconnected'
     if conn:
         conn.close()
     return jsonify({'status': 'healthy', 'database': db_status, 'version': '1.0'})
 
+@app.route('/metrics')
+@require_operator
+def metrics():
+    """Process-wide state across all tenants, for operators only"""
+    return jsonify({
+        'status': 'success',
+        'metrics': {
+            'read_coalescing': employees_flight.stats(),
+            'database': db.get_router().stats(),
+            'logging': logging_config.stats(),
+            'query_cache': query_builder.cache_stats(),
+            'outbox': outbox.stats()
+        }
+    })
+
 @app.route('/test-db')
 def test_db():
-    conn = get_db_connection()
+    conn = get_db_connection(tenant=tenants.all_tenants()[0])
     if not conn:
         return jsonify({'status': 'error', 'message': 'Could not connect to database'}), 500
     
@@ -109,7 +199,7 @@ def test_db():
             'tables': tables
         })
     except Exception as e:
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+        return logging_config.error_response(e)
 
 # ------------------------
 # Run app
@@ -122,4 +212,10 @@ if __name__ == '__main__':
     print(f"🔧 Debug Mode: {Config.DEBUG}")
     print("="*70)
     print("\n📍 API running on: http://localhost:5000\n")
+    # Deliver employee change events recorded in the outbox. Only the server
+    # starts the dispatcher: scripts that import app (archive.py,
+    # timeseries.py) must not. With the debug reloader, the serving process
+    # is the child it spawns.
+    if Config.OUTBOX_ENABLED and (not Config.DEBUG or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+        outbox.start_dispatcher()
     app.run(debug=Config.DEBUG, port=5000)
@@ -0,0 +1,264 @@
+"""
+Archival of long-inactive employees
+
+Soft-deleted employees are moved from `employees` into `employees_archive`
+in small, throttled batches so the hot table stays small. Run it from the
+API (POST /api/employees/archive) or from cron with `python archive.py`.
+"""
+from flask import Blueprint, request, jsonify
+from datetime import datetime
+import logging
+import threading
+import time
+import pymysql
+from config import Config
+from employees import require_auth
+from logging_config import error_response, get_request_id
+import tenants
+
+# Create Blueprint
+archive_bp = Blueprint('archive', __name__, url_prefix='/api/employees/archive')
+
+ARCHIVED_COLUMNS = (
+    "id, name, email, phone, department_id, salary, join_date, "
+    "status, created_at, updated_at"
+)
+# A restore counts as an update: the row must not look due for archival
+# again, and delta sync (GET /api/employees/changes) must pick it up
+RESTORED_VALUES = (
+    "id, name, email, phone, department_id, salary, join_date, "
+    "status, created_at, NOW()"
+)
+
+_runs_lock = threading.Lock()
+_runs = {}  # tenant -> (lock held while a run is in progress, last run status)
+
+logger = logging.getLogger(__name__)
+
+
+def _tenant_run(tenant):
+    with _runs_lock:
+        if tenant not in _runs:
+            _runs[tenant] = (threading.Lock(), {'state': 'idle'})
+        return _runs[tenant]
+
+
+def _archive_batch(conn, cursor, max_age_days, batch_size):
+    """Move one batch of old inactive employees. Returns the number moved."""
+    # Lock only this batch's rows; everything else stays writable. Ordering
+    # by the (status, updated_at) index lets the locking read walk it and
+    # stop after batch_size rows, instead of sorting (and locking) every
+    # match or scanning the primary key through active rows.
+    cursor.execute("""
+        SELECT id FROM employees
+        WHERE status = 'inactive'
+            AND updated_at < DATE_SUB(NOW(), INTERVAL %s DAY)
+        ORDER BY updated_at, id
+        LIMIT %s
+        FOR UPDATE
+    """, (max_age_days, batch_size))
+    ids = [row['id'] for row in cursor.fetchall()]
+    if not ids:
+        conn.rollback()
+        return 0
+
+    placeholders = ', '.join(['%s'] * len(ids))
+    cursor.execute(f"""
+        INSERT INTO employees_archive ({ARCHIVED_COLUMNS}, archived_at)
+        SELECT {ARCHIVED_COLUMNS}, NOW() FROM employees
+        WHERE id IN ({placeholders})
+    """, ids)
+    cursor.execute(f"DELETE FROM employees WHERE id IN ({placeholders})", ids)
+    conn.commit()
+    return len(ids)
+
+
+def archive_inactive(max_age_days=None, batch_size=None, pause=None, max_batches=None,
+                     tenant=None):
+    """
+    Archive one tenant's inactive employees not updated for max_age_days.
+    Returns the total number of employees archived.
+    """
+    from app import get_db_connection
+
+    tenant = tenant or tenants.current_tenant()
+    _, last_run = _tenant_run(tenant)
+
+    max_age_days = Config.ARCHIVE_AFTER_DAYS if max_age_days is None else max_age_days
+    batch_size = batch_size or Config.ARCHIVE_BATCH_SIZE
+    pause = Config.ARCHIVE_BATCH_PAUSE if pause is None else pause
+
+    conn = get_db_connection(tenant=tenant)
+    if not conn:
+        raise RuntimeError('Database connection failed')
+
+    total = 0
+    batches = 0
+    try:
+        cursor = conn.cursor()
+        while max_batches is None or batches < max_batches:
+            moved = _archive_batch(conn, cursor, max_age_days, batch_size)
+            total += moved
+            batches += 1
+            last_run['archived'] = total
+            if moved < batch_size:
+                break
+            time.sleep(pause)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    return total
+
+
+def restore_employee(emp_id):
+    """
+    Move an archived employee back into the employees table.
+    Returns False if the employee is not archived.
+    """
+    from app import get_db_connection
+
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError('Database connection failed')
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT id FROM employees_archive WHERE id = %s FOR UPDATE",
+            (emp_id,)
+        )
+        if not cursor.fetchone():
+            conn.rollback()
+            return False
+
+        cursor.execute(f"""
+            INSERT INTO employees ({ARCHIVED_COLUMNS})
+            SELECT {RESTORED_VALUES} FROM employees_archive WHERE id = %s
+        """, (emp_id,))
+        cursor.execute("DELETE FROM employees_archive WHERE id = %s", (emp_id,))
+        conn.commit()
+        return True
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def _run_in_background(max_age_days, request_id, tenant):
+    run_lock, last_run = _tenant_run(tenant)
+    try:
+        total = archive_inactive(max_age_days=max_age_days, tenant=tenant)
+        last_run.update(state='completed', archived=total)
+        logger.info('Archival completed', extra={
+            'event': 'archive.completed', 'archived': total, 'request_id': request_id,
+            'tenant': tenant
+        })
+    except Exception as e:
+        last_run.update(state='failed', message='Archival failed')
+        logger.error('Archival failed', exc_info=e, extra={
+            'event': 'archive.failed', 'request_id': request_id, 'tenant': tenant
+        })
+    finally:
+        last_run['finished_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        run_lock.release()
+
+# ============================================================
+# Routes
+# ============================================================
+
+@archive_bp.route('', methods=['POST'])
+@require_auth
+def start_archive():
+    """
+    Start an archival run in the background
+    POST /api/employees/archive
+    Body (optional): {"max_age_days": 365}
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        max_age_days = data.get('max_age_days', Config.ARCHIVE_AFTER_DAYS)
+        if not isinstance(max_age_days, int) or max_age_days < 0:
+            return jsonify({
+                'status': 'error',
+                'message': 'max_age_days must be a non-negative integer'
+            }), 400
+
+        tenant = tenants.current_tenant()
+        run_lock, last_run = _tenant_run(tenant)
+        if not run_lock.acquire(blocking=False):
+            return jsonify({
+                'status': 'error',
+                'message': 'An archival run is already in progress'
+            }), 409
+
+        last_run.clear()
+        last_run.update(
+            state='running',
+            archived=0,
+            max_age_days=max_age_days,
+            request_id=get_request_id(),
+            started_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        )
+        threading.Thread(
+            target=_run_in_background,
+            args=(max_age_days, get_request_id(), tenant),
+            daemon=True
+        ).start()
+
+        return jsonify({
+            'status': 'success',
+            'message': 'Archival started',
+            'run': dict(last_run)
+        }), 202
+
+    except Exception as e:
+        return error_response(e)
+
+@archive_bp.route('', methods=['GET'])
+@require_auth
+def get_archive_status():
+    """
+    Status of the last archival run
+    GET /api/employees/archive
+    """
+    _, last_run = _tenant_run(tenants.current_tenant())
+    return jsonify({
+        'status': 'success',
+        'run': dict(last_run)
+    }), 200
+
+@archive_bp.route('/<int:emp_id>/restore', methods=['POST'])
+@require_auth
+def restore(emp_id):
+    """
+    Restore an archived employee into the employees table
+    POST /api/employees/archive/1/restore
+    """
+    try:
+        if not restore_employee(emp_id):
+            return jsonify({
+                'status': 'error',
+                'message': 'Archived employee not found'
+            }), 404
+
+        return jsonify({
+            'status': 'success',
+            'message': 'Employee restored successfully'
+        }), 200
+
+    except pymysql.err.IntegrityError:
+        return jsonify({
+            'status': 'error',
+            'message': 'Email already in use by another employee'
+        }), 409
+    except Exception as e:
+        return error_response(e)
+
+
+if __name__ == '__main__':
+    for tenant in tenants.all_tenants():
+        print(f"{tenant}: archived {archive_inactive(tenant=tenant)} inactive employees")
@@ -6,6 +6,8 @@ import bcrypt
 import jwt
 import datetime
 from config import Config
+from logging_config import error_response
+import tenants
 
 # Create Blueprint
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
@@ -23,11 +25,12 @@ def verify_password(password, hashed_password):
         hashed_password.encode('utf-8')
     )
 
-def generate_token(user_id, username):
+def generate_token(user_id, username, tenant=None):
     """Generate JWT token"""
     payload = {
         'user_id': user_id,
         'username': username,
+        'tenant': tenant or Config.DEFAULT_TENANT,
         'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=24),
         'iat': datetime.datetime.utcnow()
     }
@@ -59,12 +62,19 @@ def login():
         
         username = data['username']
         password = data['password']
+        tenant = data.get('tenant') or Config.DEFAULT_TENANT
+        
+        if not tenants.is_known(tenant):
+            return jsonify({
+                'status': 'error',
+                'message': 'Invalid username or password'
+            }), 401
         
         # Import here to avoid circular import
         from app import get_db_connection
         
-        # Get user from database
-        conn = get_db_connection()
+        # Get user from the tenant's database
+        conn = get_db_connection(tenant=tenant)
         if not conn:
             return jsonify({
                 'status': 'error',
@@ -95,7 +105,7 @@ def login():
             }), 401
         
         # Generate token
-        token = generate_token(user['id'], user['username'])
+        token = generate_token(user['id'], user['username'], tenant)
         
         return jsonify({
             'status': 'success',
@@ -104,15 +114,13 @@ def login():
             'user': {
                 'id': user['id'],
                 'username': user['username'],
-                'email': user['email']
+                'email': user['email'],
+                'tenant': tenant
             }
         }), 200
         
     except Exception as e:
-        return jsonify({
-            'status': 'error',
-            'message': str(e)
-        }), 500
+        return error_response(e)
 
 @auth_bp.route('/verify', methods=['GET'])
 def verify():
@@ -150,15 +158,13 @@ def verify():
             'message': 'Token is valid',
             'user': {
                 'id': payload['user_id'],
-                'username': payload['username']
+                'username': payload['username'],
+                'tenant': payload.get('tenant', Config.DEFAULT_TENANT)
             }
         }), 200
         
     except Exception as e:
-        return jsonify({
-            'status': 'error',
-            'message': str(e)
-        }), 500
+        return error_response(e)
 
 @auth_bp.route('/change-password', methods=['POST'])
 def change_password():
@@ -193,7 +199,7 @@ def change_password():
         
         # Get user
         from app import get_db_connection
-        conn = get_db_connection()
+        conn = get_db_connection(tenant=payload.get('tenant', Config.DEFAULT_TENANT))
         cursor = conn.cursor()
         
         cursor.execute(
@@ -224,7 +230,4 @@ def change_password():
         }), 200
         
     except Exception as e:
-        return jsonify({
-            'status': 'error',
-            'message': str(e)
-        }), 500
\ No newline at end of file
+        return error_response(e)
\ No newline at end of file
@@ -0,0 +1,117 @@
+"""
+Benchmark: JSON list response vs compact formats
+
+Encodes a synthetic employee list the way GET /api/employees does for
+each format and reports payload size, server encode CPU time and client
+decode time. No database needed.
+Usage: python bench_formats.py [rows]
+"""
+import json
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from flask import Flask
+from pymysql.constants import FIELD_TYPE
+import formats
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+REPEAT = 5
+
+DESCRIPTION = [
+    ('id', FIELD_TYPE.LONG), ('name', FIELD_TYPE.VAR_STRING),
+    ('email', FIELD_TYPE.VAR_STRING), ('phone', FIELD_TYPE.VAR_STRING),
+    ('department_id', FIELD_TYPE.LONG), ('salary', FIELD_TYPE.NEWDECIMAL),
+    ('join_date', FIELD_TYPE.DATE), ('status', FIELD_TYPE.VAR_STRING),
+    ('created_at', FIELD_TYPE.TIMESTAMP), ('department_name', FIELD_TYPE.VAR_STRING)
+]
+COLUMNS = [name for name, _ in DESCRIPTION]
+
+
+class TupleCursor:
+    """Stands in for a pymysql tuple cursor holding the result"""
+
+    def __init__(self, rows):
+        self.description = [(name, type_code) for name, type_code in DESCRIPTION]
+        self._rows = rows
+
+    def fetchall(self):
+        return self._rows
+
+
+def make_rows():
+    start = datetime(2020, 1, 1, 9, 0, 0)
+    return [
+        (i, f'Employee {i}', f'employee{i}@company.com', f'98765{i:05d}',
+         i % 6 + 1, Decimal(40000 + i % 50000) + Decimal('0.50'),
+         date(2020, 1, 1) + timedelta(days=i % 1500), 'active',
+         start + timedelta(minutes=i), 'Engineering')
+        for i in range(ROWS)
+    ]
+
+
+def encode_json(rows):
+    # What the handler does today: dict rows from DictCursor, dates formatted, jsonify
+    employees = [dict(zip(COLUMNS, row)) for row in rows]
+    for emp in employees:
+        emp['join_date'] = emp['join_date'].strftime('%Y-%m-%d')
+        emp['created_at'] = emp['created_at'].strftime('%Y-%m-%d %H:%M:%S')
+    return formats.encode(
+        {'status': 'success', 'count': len(employees), 'employees': employees},
+        formats.JSON
+    )
+
+
+def encode_compact(rows, fmt):
+    table = formats.columnar(TupleCursor(rows))
+    return formats.encode({'status': 'success', 'count': len(rows), **table}, fmt)
+
+
+def measure(encode, decode):
+    body = None
+    started = time.process_time()
+    for _ in range(REPEAT):
+        body = encode()
+    encode_ms = (time.process_time() - started) / REPEAT * 1000
+
+    started = time.perf_counter()
+    for _ in range(REPEAT):
+        decode(body)
+    decode_ms = (time.perf_counter() - started) / REPEAT * 1000
+    return len(body), encode_ms, decode_ms
+
+
+def main():
+    rows = make_rows()
+    app = Flask(__name__)
+
+    cases = [
+        ('json (current)', lambda: encode_json(rows), json.loads),
+        ('columnar json', lambda: encode_compact(rows, formats.COLUMNAR), json.loads),
+    ]
+    if formats.msgpack:
+        cases.append((
+            'msgpack', lambda: encode_compact(rows, formats.MSGPACK),
+            lambda body: formats.msgpack.unpackb(body, raw=False)
+        ))
+    else:
+        print("(msgpack not installed: skipping MessagePack)")
+
+    print("=" * 70)
+    print(f"Response format benchmark ({ROWS} rows, averaged over {REPEAT} runs)")
+    print("=" * 70)
+    print(f"{'format':<18}{'size KB':>12}{'vs json':>10}{'encode ms':>14}{'decode ms':>14}")
+
+    with app.app_context():
+        baseline = None
+        for label, encode, decode in cases:
+            size, encode_ms, decode_ms = measure(encode, decode)
+            baseline = baseline or size
+            print(
+                f"{label:<18}{size / 1024:>12.1f}{size / baseline - 1:>+10.0%}"
+                f"{encode_ms:>14.1f}{decode_ms:>14.1f}"
+            )
+
+
+if __name__ == '__main__':
+    main()
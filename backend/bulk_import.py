@@ -0,0 +1,439 @@
+"""
+Bulk employee import from CSV/XLSX uploads
+"""
+from flask import Blueprint, request, jsonify, Response
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from datetime import datetime, date
+from decimal import Decimal, InvalidOperation
+import csv
+import io
+import logging
+import os
+import tempfile
+import threading
+import uuid
+import pymysql
+from config import Config
+from employees import require_auth
+from logging_config import error_response, get_request_id
+import tenants
+
+# Create Blueprint
+import_bp = Blueprint('import', __name__, url_prefix='/api/employees/import')
+
+COLUMNS = ['name', 'email', 'phone', 'department_id', 'salary', 'join_date', 'status']
+REQUIRED = ['name', 'email', 'department_id']
+STATUSES = ('active', 'inactive')
+# Column limits of the employees table, checked so a bad cell is reported
+# on its own row instead of failing the batch insert
+MAX_LENGTHS = {'name': 100, 'email': 100, 'phone': 20}
+MAX_SALARY = Decimal('99999999.99')  # DECIMAL(10,2)
+
+# Row values the database itself refuses (too long, out of range, charset)
+REJECTED_BY_DATABASE = (pymysql.err.IntegrityError, pymysql.err.DataError)
+
+INSERT_SQL = """
+    INSERT INTO employees
+    (name, email, phone, department_id, salary, join_date, status)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+"""
+
+_executor = ThreadPoolExecutor(max_workers=Config.IMPORT_WORKERS)
+_jobs = OrderedDict()
+_jobs_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+class ImportJob:
+    """Progress and error report of one background import"""
+
+    def __init__(self, filename, tenant):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.tenant = tenant
+        self.request_id = get_request_id()
+        self.state = 'queued'
+        self.message = None
+        self.rows_processed = 0
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+        self.created_at = datetime.now()
+        self.finished_at = None
+
+    def add_error(self, row_number, email, message):
+        self.failed += 1
+        if len(self.errors) < Config.IMPORT_MAX_ERRORS:
+            self.errors.append((row_number, email, message))
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'filename': self.filename,
+            'request_id': self.request_id,
+            'state': self.state,
+            'message': self.message,
+            'rows_processed': self.rows_processed,
+            'inserted': self.inserted,
+            'failed': self.failed,
+            'errors': [
+                {'row': row, 'email': email, 'error': message}
+                for row, email, message in self.errors[:20]
+            ],
+            'errors_truncated': self.failed > len(self.errors),
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'finished_at': (
+                self.finished_at.strftime('%Y-%m-%d %H:%M:%S')
+                if self.finished_at else None
+            )
+        }
+
+
+def _register_job(job):
+    with _jobs_lock:
+        _jobs[job.id] = job
+        # Drop the oldest finished jobs beyond the history limit
+        finished = [j for j in _jobs.values() if j.finished_at]
+        for old in finished[:max(0, len(finished) - Config.IMPORT_JOB_HISTORY)]:
+            del _jobs[old.id]
+
+
+def _get_job(job_id):
+    """The job, if it belongs to the current tenant"""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+    if job and job.tenant == tenants.current_tenant():
+        return job
+    return None
+
+
+def _unfinished_jobs(tenant):
+    with _jobs_lock:
+        return sum(1 for j in _jobs.values() if j.tenant == tenant and not j.finished_at)
+
+# ============================================================
+# Streaming parsers
+# ============================================================
+
+def _iter_csv(path):
+    """Yield (row_number, dict) from a CSV file without loading it"""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        reader.fieldnames = [(h or '').strip().lower() for h in reader.fieldnames or []]
+        for row_number, row in enumerate(reader, start=2):
+            yield row_number, row
+
+
+def _iter_xlsx(path):
+    """Yield (row_number, dict) from the first sheet of an XLSX file"""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None) or []
+        header = [str(h or '').strip().lower() for h in header]
+        for row_number, values in enumerate(rows, start=2):
+            if values is None or all(v is None for v in values):
+                continue
+            yield row_number, dict(zip(header, values))
+    finally:
+        wb.close()
+
+
+def _chunks(rows, size):
+    chunk = []
+    for item in rows:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+# ============================================================
+# Validation
+# ============================================================
+
+def _clean(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+
+def _parse_department_id(value):
+    # Spreadsheets deliver whole numbers as floats (2.0); anything that is
+    # not a whole number, including inf and nan, is invalid
+    if isinstance(value, float):
+        if not value.is_integer():
+            raise ValueError('Invalid department ID')
+        return int(value)
+    try:
+        return int(str(value))
+    except ValueError:
+        raise ValueError('Invalid department ID')
+
+
+def _parse_row(row):
+    """Convert one raw row into insert values, raising ValueError if invalid"""
+    values = {field: _clean(row.get(field)) for field in COLUMNS}
+
+    missing = [field for field in REQUIRED if values[field] is None]
+    if missing:
+        raise ValueError(f'Missing required fields: {", ".join(missing)}')
+
+    values['email'] = str(values['email'])
+    values['name'] = str(values['name'])
+    if values['phone'] is not None:
+        values['phone'] = str(values['phone'])
+    for field, limit in MAX_LENGTHS.items():
+        if values[field] is not None and len(values[field]) > limit:
+            raise ValueError(f'{field} is longer than {limit} characters')
+
+    values['department_id'] = _parse_department_id(values['department_id'])
+
+    if values['salary'] is not None:
+        try:
+            values['salary'] = Decimal(str(values['salary']))
+        except InvalidOperation:
+            raise ValueError('Invalid salary')
+        if not values['salary'].is_finite():
+            raise ValueError('Invalid salary')
+        if abs(values['salary']) > MAX_SALARY:
+            raise ValueError(f'Salary must be at most {MAX_SALARY}')
+
+    join_date = values['join_date']
+    if isinstance(join_date, datetime):
+        values['join_date'] = join_date.date()
+    elif join_date is not None and not isinstance(join_date, date):
+        try:
+            values['join_date'] = datetime.strptime(str(join_date), '%Y-%m-%d').date()
+        except ValueError:
+            raise ValueError('Invalid join_date, expected YYYY-MM-DD')
+
+    values['status'] = str(values['status'] or 'active').lower()
+    if values['status'] not in STATUSES:
+        raise ValueError('Invalid status')
+
+    return values
+
+
+def _existing_emails(cursor, emails):
+    """Emails from this chunk that are already in the database (one query)"""
+    if not emails:
+        return set()
+    placeholders = ', '.join(['%s'] * len(emails))
+    cursor.execute(
+        f"SELECT email FROM employees WHERE email IN ({placeholders})",
+        list(emails)
+    )
+    return {row['email'].lower() for row in cursor.fetchall()}
+
+# ============================================================
+# Job runner
+# ============================================================
+
+def _insert_chunk(conn, cursor, job, valid):
+    """Batch insert one validated chunk, falling back to row by row on rejects"""
+    import outbox
+    import timeseries
+
+    rows = [tuple(values[field] for field in COLUMNS) for _, values in valid]
+    try:
+        cursor.executemany(INSERT_SQL, rows)
+        timeseries.record_created_batch(cursor, [values for _, values in valid])
+        outbox.record_created_by_email(cursor, [values['email'] for _, values in valid])
+        conn.commit()
+        job.inserted += len(rows)
+        return
+    except REJECTED_BY_DATABASE:
+        conn.rollback()
+
+    # A conflicting email inserted meanwhile, or a value the database
+    # refuses: isolate the bad rows
+    for (row_number, values), params in zip(valid, rows):
+        try:
+            cursor.execute(INSERT_SQL, params)
+            emp_id = cursor.lastrowid
+            timeseries.record_created(cursor, values)
+            outbox.record_event(cursor, emp_id, outbox.CREATED)
+            conn.commit()
+            job.inserted += 1
+        except REJECTED_BY_DATABASE as e:
+            conn.rollback()
+            job.add_error(row_number, values['email'], f'Rejected by database: {e.args[-1]}')
+
+
+def _run_import(job, path, kind):
+    from app import get_db_connection
+
+    job.state = 'running'
+    conn = None
+    try:
+        conn = get_db_connection(tenant=job.tenant)
+        if not conn:
+            raise RuntimeError('Database connection failed')
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT id FROM departments")
+        departments = {row['id'] for row in cursor.fetchall()}
+        seen_emails = set()
+
+        rows = _iter_xlsx(path) if kind == 'xlsx' else _iter_csv(path)
+        for chunk in _chunks(rows, Config.IMPORT_CHUNK_SIZE):
+            parsed = []
+            for row_number, row in chunk:
+                try:
+                    parsed.append((row_number, _parse_row(row)))
+                except ValueError as e:
+                    job.add_error(row_number, _clean(row.get('email')), str(e))
+
+            existing = _existing_emails(
+                cursor, {values['email'] for _, values in parsed}
+            )
+
+            valid = []
+            for row_number, values in parsed:
+                email = values['email'].lower()
+                if values['department_id'] not in departments:
+                    job.add_error(row_number, values['email'], 'Invalid department ID')
+                elif email in existing:
+                    job.add_error(row_number, values['email'], 'Email already exists')
+                elif email in seen_emails:
+                    job.add_error(row_number, values['email'], 'Duplicate email in file')
+                else:
+                    seen_emails.add(email)
+                    valid.append((row_number, values))
+
+            if valid:
+                _insert_chunk(conn, cursor, job, valid)
+            job.rows_processed += len(chunk)
+
+        job.state = 'completed'
+        logger.info('Import completed', extra={
+            'event': 'import.completed', 'job_id': job.id, 'request_id': job.request_id,
+            'tenant': job.tenant, 'inserted': job.inserted, 'failed': job.failed
+        })
+    except Exception as e:
+        job.state = 'failed'
+        job.message = 'Import failed'
+        logger.error('Import failed', exc_info=e, extra={
+            'event': 'import.failed', 'job_id': job.id, 'request_id': job.request_id,
+            'tenant': job.tenant
+        })
+    finally:
+        if conn:
+            conn.close()
+        job.finished_at = datetime.now()
+        os.remove(path)
+
+# ============================================================
+# Routes
+# ============================================================
+
+@import_bp.route('', methods=['POST'])
+@require_auth
+def start_import():
+    """
+    Start a background import
+    POST /api/employees/import   (multipart/form-data, field "file")
+    Columns: name, email, phone, department_id, salary, join_date, status
+    """
+    try:
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            return jsonify({
+                'status': 'error',
+                'message': 'No file uploaded'
+            }), 400
+
+        kind = upload.filename.rsplit('.', 1)[-1].lower()
+        if kind not in ('csv', 'xlsx'):
+            return jsonify({
+                'status': 'error',
+                'message': 'Only .csv and .xlsx files are supported'
+            }), 400
+
+        if kind == 'xlsx':
+            try:
+                import openpyxl  # noqa: F401
+            except ImportError:
+                return jsonify({
+                    'status': 'error',
+                    'message': 'XLSX import requires the openpyxl package'
+                }), 400
+
+        # Import workers are shared: keep one tenant from queueing them all up
+        tenant = tenants.current_tenant()
+        if _unfinished_jobs(tenant) >= Config.IMPORT_MAX_JOBS_PER_TENANT:
+            return jsonify({
+                'status': 'error',
+                'message': 'Too many imports in progress; wait for one to finish'
+            }), 429
+
+        # Spool the upload to disk in chunks; the job parses it from there
+        fd, path = tempfile.mkstemp(prefix='employee-import-', suffix='.' + kind)
+        with os.fdopen(fd, 'wb') as f:
+            upload.save(f)
+
+        job = ImportJob(upload.filename, tenant)
+        _register_job(job)
+        _executor.submit(_run_import, job, path, kind)
+
+        return jsonify({
+            'status': 'success',
+            'message': 'Import started',
+            'job': job.to_dict()
+        }), 202
+
+    except Exception as e:
+        return error_response(e)
+
+@import_bp.route('/<job_id>', methods=['GET'])
+@require_auth
+def get_import(job_id):
+    """
+    Poll import progress
+    GET /api/employees/import/<job_id>
+    """
+    job = _get_job(job_id)
+    if not job:
+        return jsonify({
+            'status': 'error',
+            'message': 'Import job not found'
+        }), 404
+
+    return jsonify({
+        'status': 'success',
+        'job': job.to_dict()
+    }), 200
+
+@import_bp.route('/<job_id>/errors', methods=['GET'])
+@require_auth
+def get_import_errors(job_id):
+    """
+    Download the error report as CSV
+    GET /api/employees/import/<job_id>/errors
+    """
+    job = _get_job(job_id)
+    if not job:
+        return jsonify({
+            'status': 'error',
+            'message': 'Import job not found'
+        }), 404
+
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(['row', 'email', 'error'])
+    writer.writerows(sorted(job.errors, key=lambda e: e[0]))
+
+    return Response(
+        out.getvalue(),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename=import-{job.id}-errors.csv'}
+    )
@@ -4,9 +4,83 @@ class Config:
     DB_USER = "root"
     DB_PASSWORD = "8897"
     DB_NAME = "employee_db"
+    DB_PORT = 3306
+
+    # Connection pool
+    DB_POOL_SIZE = 10
+    DB_POOL_TIMEOUT = 5           # seconds to wait for a free connection
+    DB_POOL_PING_AFTER = 30       # ping idle connections older than this (seconds)
+
+    # Read replicas, e.g. [{"host": "localhost", "port": 3307}]
+    DB_REPLICAS = []
+    DB_REPLICA_SELECTION = "round_robin"    # or "least_latency"
+    DB_REPLICA_MAX_LAG = 5        # seconds behind before leaving rotation
+    DB_REPLICA_CHECK_INTERVAL = 2 # seconds between lag checks
+
+    # Tenants: id -> database with the same schema on this server, e.g.
+    # {"acme": {"database": "employee_db_acme"}}. Empty means single-tenant
+    # (DEFAULT_TENANT on DB_NAME).
+    TENANTS = {}
+    DEFAULT_TENANT = "default"
+    DB_TENANT_MAX_CONNECTIONS = 4 # pool connections one tenant may hold at once
 
     # JWT
     JWT_SECRET_KEY = "dev-secret-key-123"
 
+    # Operators: X-Operator-Token for /metrics and /api/admin/* (which see
+    # every tenant). None disables those endpoints.
+    OPERATOR_TOKEN = None
+
     # Flask
     DEBUG = True
+
+    # Listing
+    LIST_MAX_LIMIT = 1000         # largest page for GET /api/employees?limit=
+    LIST_FETCH_SIZE = 1000        # rows fetched and encoded at a time
+    LIST_MAX_ROWS = 50000         # rows one unpaged list response may hold
+    LIST_MAX_BYTES = 32 * 1024 * 1024  # encoded size one list response may reach
+
+    # Delta sync (GET /api/employees/changes)
+    CHANGES_MAX_LIMIT = 5000      # rows per page
+    CHANGES_OVERLAP_SECONDS = 10  # re-sent each sync for late commits; keep above
+                                  # DB_REPLICA_MAX_LAG + DB_REPLICA_CHECK_INTERVAL
+
+    # Multi-get
+    BATCH_MAX_IDS = 100           # employees per GET /api/employees/batch
+
+    # Bulk import
+    IMPORT_CHUNK_SIZE = 1000      # rows validated and inserted per batch
+    IMPORT_MAX_ERRORS = 10000     # row errors kept for the error report
+    IMPORT_WORKERS = 2            # concurrent background import jobs
+    IMPORT_JOB_HISTORY = 50       # finished jobs kept for polling
+    IMPORT_MAX_JOBS_PER_TENANT = 2  # queued or running imports per tenant
+
+    # Archival of inactive employees
+    ARCHIVE_AFTER_DAYS = 365      # inactive for longer than this gets archived
+    ARCHIVE_BATCH_SIZE = 500      # rows moved per transaction
+    ARCHIVE_BATCH_PAUSE = 0.2     # seconds to sleep between batches
+
+    # Logging
+    LOG_LEVEL = "INFO"
+    LOG_QUEUE_SIZE = 10000        # records buffered before new ones are dropped
+    LOG_SAMPLE_RATES = {          # fraction of these events that gets logged
+        'http.request': 0.1,
+        'db.connect_failed': 0.1
+    }
+
+    # Outbox delivery of employee change events
+    OUTBOX_ENABLED = True
+    OUTBOX_SINK = "file"          # "file", "http" or "queue" (in-process)
+    OUTBOX_FILE = "employee_events.jsonl"
+    OUTBOX_HTTP_URL = "http://localhost:5001/events"
+    OUTBOX_BATCH_SIZE = 500       # events per delivery
+    OUTBOX_POLL_INTERVAL = 1.0    # seconds between polls when caught up
+    OUTBOX_RETRY_BASE = 1.0       # first retry delay, doubled per attempt
+    OUTBOX_RETRY_MAX = 300        # longest retry delay in seconds
+    OUTBOX_RETENTION_DAYS = 7     # delivered events kept this long
+
+    # Profiling (POST /api/admin/profile)
+    PROFILE_INTERVAL_MS = 5       # default time between stack samples
+    PROFILE_MAX_SECONDS = 300     # longest allowed session
+    PROFILE_TRACEMALLOC_FRAMES = 1  # frames kept per allocation while profiling
+    PROFILE_TRACEMALLOC_TOP = 25  # allocation sites reported
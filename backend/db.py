@@ -0,0 +1,365 @@
+"""
+Database connection pools and replica routing
+
+get_db_connection() hands out PooledConnection wrappers. Handlers use them
+exactly like pymysql connections; close() rolls back anything uncommitted
+and returns the connection to the pool instead of disconnecting.
+
+Reads that pass readonly=True go to a healthy replica when replicas are
+configured; everything else goes to the primary. After a session commits
+on the primary, its reads stay on the primary until any replica still in
+rotation must have caught up (read-your-writes). Each process remembers its
+own writes; with several worker processes the guarantee relies on the
+client echoing the X-Last-Write time it was given (see app.py).
+
+Tenants share each server's pool: a connection switches to the tenant's
+database on checkout (preferring an idle connection already on it), and
+no tenant may hold more than DB_TENANT_MAX_CONNECTIONS at once, so one
+busy tenant cannot starve the rest. A tenant still at its limit after
+DB_POOL_TIMEOUT gets TenantBusy (HTTP 503) rather than a replica's or the
+primary's connections.
+"""
+from collections import Counter
+import itertools
+import logging
+import threading
+import time
+import pymysql
+from config import Config
+import tenants
+
+logger = logging.getLogger(__name__)
+
+
+class TenantBusy(TimeoutError):
+    """A tenant already holds all of its connections to a server"""
+
+
+class PooledConnection:
+    """pymysql connection checked out of a ConnectionPool"""
+
+    def __init__(self, pool, raw, on_commit=None, tenant=None):
+        self._pool = pool
+        self._raw = raw
+        self._on_commit = on_commit
+        self.tenant = tenant
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def commit(self):
+        self._raw.commit()
+        if self._on_commit:
+            self._on_commit()
+
+    def close(self):
+        if self._raw is not None:
+            raw, self._raw = self._raw, None
+            self._pool.release(raw, self.tenant)
+
+    def __del__(self):
+        # Safety net for handlers that return early without close()
+        self.close()
+
+
+class ConnectionPool:
+    """Fixed-size pool of pymysql connections shared by all tenants"""
+
+    def __init__(self, size, timeout, **connect_kwargs):
+        self.size = size
+        self.timeout = timeout
+        self.connect_kwargs = connect_kwargs
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        self._tenant_slots = {}
+        self._tenant_in_use = Counter()
+
+    def _connect(self):
+        raw = pymysql.connect(**self.connect_kwargs)
+        raw.current_db = self.connect_kwargs.get('database')
+        raw.last_used = time.monotonic()
+        return raw
+
+    def _tenant_limit(self, tenant):
+        with self._lock:
+            slots = self._tenant_slots.get(tenant)
+            if slots is None:
+                limit = Config.DB_TENANT_MAX_CONNECTIONS if tenants.is_multi_tenant() else self.size
+                slots = self._tenant_slots[tenant] = threading.BoundedSemaphore(min(limit, self.size))
+            return slots
+
+    def _take_idle(self, database):
+        """Most recently used idle connection, preferring one already on database"""
+        with self._lock:
+            for i in range(len(self._idle) - 1, -1, -1):
+                if self._idle[i].current_db == database:
+                    return self._idle.pop(i)
+            return self._idle.pop() if self._idle else None
+
+    def acquire(self, on_commit=None, tenant=None, database=None):
+        deadline = time.monotonic() + self.timeout
+        tenant_slots = self._tenant_limit(tenant)
+        if not tenant_slots.acquire(timeout=self.timeout):
+            raise TenantBusy(f'Tenant {tenant} is using all of its database connections')
+        if not self._slots.acquire(timeout=max(deadline - time.monotonic(), 0)):
+            tenant_slots.release()
+            raise TimeoutError('Timed out waiting for a database connection')
+        try:
+            raw = self._take_idle(database)
+            if raw is None:
+                raw = self._connect()
+            elif time.monotonic() - raw.last_used > Config.DB_POOL_PING_AFTER:
+                thread_id = raw.thread_id()
+                raw.ping(reconnect=True)
+                if raw.thread_id() != thread_id:
+                    raw.current_db = self.connect_kwargs.get('database')
+            if database and raw.current_db != database:
+                raw.select_db(database)
+                raw.current_db = database
+        except Exception:
+            self._slots.release()
+            tenant_slots.release()
+            raise
+        with self._lock:
+            self._tenant_in_use[tenant] += 1
+        return PooledConnection(self, raw, on_commit, tenant)
+
+    def release(self, raw, tenant=None):
+        try:
+            raw.rollback()
+            raw.last_used = time.monotonic()
+            with self._lock:
+                self._idle.append(raw)
+        except Exception:
+            # Broken connection: drop it, a new one is opened on demand
+            try:
+                raw.close()
+            except Exception:
+                pass
+        finally:
+            with self._lock:
+                self._tenant_in_use[tenant] -= 1
+                if not self._tenant_in_use[tenant]:
+                    del self._tenant_in_use[tenant]
+            self._slots.release()
+            self._tenant_slots[tenant].release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self.size,
+                'idle': len(self._idle),
+                'in_use_by_tenant': dict(self._tenant_in_use)
+            }
+
+
+class Replica:
+    """A read replica with its pool and the monitor's latest health data"""
+
+    def __init__(self, host, port):
+        self.name = f'{host}:{port}'
+        self.host = host
+        self.port = port
+        self.pool = _make_pool(host, port)
+        self.healthy = False
+        self.lag = None
+        self.latency = None
+        self.error = None
+
+    def stats(self):
+        return {
+            'healthy': self.healthy,
+            'lag_seconds': self.lag,
+            'latency_ms': round(self.latency * 1000, 2) if self.latency is not None else None,
+            'error': self.error,
+            'pool': self.pool.stats()
+        }
+
+
+class Router:
+    """Routes writes to the primary and reads to replicas"""
+
+    def __init__(self, primary, replicas):
+        self.primary = primary
+        self.replicas = replicas
+        self._round_robin = itertools.count()
+        self._last_writes = {}
+        self._lock = threading.Lock()
+        # A replica in rotation lags at most DB_REPLICA_MAX_LAG as of its last
+        # check, so after this long it has applied a session's writes.
+        self.read_your_writes_window = (
+            Config.DB_REPLICA_MAX_LAG + Config.DB_REPLICA_CHECK_INTERVAL
+        )
+        if replicas:
+            threading.Thread(target=self._monitor, daemon=True).start()
+
+    # -------- read-your-writes --------
+
+    def mark_write(self, session):
+        now = time.monotonic()
+        with self._lock:
+            self._last_writes[session] = now
+            if len(self._last_writes) > 10000:
+                cutoff = now - self.read_your_writes_window
+                self._last_writes = {
+                    k: t for k, t in self._last_writes.items() if t > cutoff
+                }
+
+    def requires_primary(self, session, last_write_at=None):
+        """
+        True if this session wrote recently enough that replicas may be stale.
+        _last_writes only knows this process's writes; last_write_at is the
+        wall-clock time of the session's last write as reported back by the
+        client, which covers writes made through another worker.
+        """
+        if last_write_at is not None \
+                and abs(time.time() - last_write_at) < self.read_your_writes_window:
+            return True
+        if session is None:
+            return False
+        last_write = self._last_writes.get(session)
+        return (
+            last_write is not None
+            and time.monotonic() - last_write < self.read_your_writes_window
+        )
+
+    # -------- routing --------
+
+    def _pick_replica(self):
+        healthy = [r for r in self.replicas if r.healthy]
+        if not healthy:
+            return None
+        if Config.DB_REPLICA_SELECTION == 'least_latency':
+            return min(healthy, key=lambda r: r.latency)
+        return healthy[next(self._round_robin) % len(healthy)]
+
+    def acquire(self, readonly=False, session=None, tenant=None, last_write_at=None,
+                on_commit=None):
+        """
+        Connection for a tenant. on_commit runs after each commit on the
+        primary, e.g. to tell the client when it last wrote.
+        """
+        database = tenants.database_for(tenant)
+        if readonly and not self.requires_primary(session, last_write_at):
+            replica = self._pick_replica()
+            if replica:
+                try:
+                    return replica.pool.acquire(tenant=tenant, database=database)
+                except TenantBusy:
+                    # The tenant's own limit, not a replica problem; spilling
+                    # onto the primary would hand it a second quota
+                    raise
+                except TimeoutError:
+                    # Replica pool busy: read from the primary this time
+                    pass
+                except pymysql.err.OperationalError as e:
+                    replica.healthy = False
+                    replica.error = str(e)
+                    logger.warning('Replica unavailable, reading from primary', extra={
+                        'event': 'db.replica_failed', 'replica': replica.name, 'error': str(e)
+                    })
+
+        def committed():
+            if session is not None:
+                self.mark_write(session)
+            if on_commit:
+                on_commit()
+
+        return self.primary.acquire(committed, tenant=tenant, database=database)
+
+    # -------- lag monitoring --------
+
+    def _check(self, replica):
+        conn = pymysql.connect(
+            host=replica.host,
+            port=replica.port,
+            user=Config.DB_USER,
+            password=Config.DB_PASSWORD,
+            cursorclass=pymysql.cursors.DictCursor,
+            connect_timeout=Config.DB_REPLICA_CHECK_INTERVAL
+        )
+        try:
+            cursor = conn.cursor()
+            started = time.perf_counter()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            latency = time.perf_counter() - started
+
+            try:
+                cursor.execute("SHOW REPLICA STATUS")
+                status = cursor.fetchone()
+                lag = status and status.get('Seconds_Behind_Source')
+            except pymysql.err.ProgrammingError:
+                # MySQL < 8.0.22
+                cursor.execute("SHOW SLAVE STATUS")
+                status = cursor.fetchone()
+                lag = status and status.get('Seconds_Behind_Master')
+        finally:
+            conn.close()
+
+        if not status:
+            raise RuntimeError('Not configured as a replica')
+        return latency, lag
+
+    def _monitor(self):
+        while True:
+            for replica in self.replicas:
+                try:
+                    latency, lag = self._check(replica)
+                    # Smooth latency so one slow probe does not flip selection
+                    replica.latency = latency if replica.latency is None \
+                        else 0.7 * replica.latency + 0.3 * latency
+                    replica.lag = lag
+                    replica.error = None if lag is not None else 'Replication stopped'
+                    healthy = lag is not None and lag <= Config.DB_REPLICA_MAX_LAG
+                except Exception as e:
+                    replica.error = str(e)
+                    healthy = False
+
+                if healthy != replica.healthy:
+                    logger.warning(
+                        'Replica back in rotation' if healthy else 'Replica out of rotation',
+                        extra={'event': 'db.replica_health', 'replica': replica.name,
+                               'lag_seconds': replica.lag, 'error': replica.error}
+                    )
+                replica.healthy = healthy
+            time.sleep(Config.DB_REPLICA_CHECK_INTERVAL)
+
+    def stats(self):
+        return {
+            'primary': self.primary.stats(),
+            'replicas': {r.name: r.stats() for r in self.replicas},
+            'sessions_pinned_to_primary': sum(
+                1 for session in list(self._last_writes) if self.requires_primary(session)
+            )
+        }
+
+
+def _make_pool(host, port):
+    return ConnectionPool(
+        Config.DB_POOL_SIZE,
+        Config.DB_POOL_TIMEOUT,
+        host=host,
+        user=Config.DB_USER,
+        password=Config.DB_PASSWORD,
+        database=Config.DB_NAME,
+        port=port,
+        cursorclass=pymysql.cursors.DictCursor
+    )
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router():
+    """The process-wide router, created on first use"""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = Router(
+                _make_pool(Config.DB_HOST, Config.DB_PORT),
+                [Replica(r['host'], r.get('port', 3306)) for r in Config.DB_REPLICAS]
+            )
+        return _router
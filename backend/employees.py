@@ -1,13 +1,105 @@
 """
 Employee CRUD Operations
 """
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response
 from auth import verify_token
+from config import Config
 from datetime import datetime
+import hmac
+import pymysql
+from singleflight import SingleFlight
+import formats
+from logging_config import error_response
+from query_builder import EmployeeQuery, QueryError
+import tenants
 
 # Create Blueprint
 employees_bp = Blueprint('employees', __name__, url_prefix='/api/employees')
 
+OPERATOR_TOKEN_HEADER = 'X-Operator-Token'
+
+# Shares one database execution between identical concurrent reads
+employees_flight = SingleFlight()
+
+# ------------------------------------------------------------
+# Fixed statements
+# ------------------------------------------------------------
+
+EMPLOYEE_DETAIL_SQL = """
+    SELECT 
+        e.id, e.name, e.email, e.phone,
+        e.department_id, e.salary, e.join_date,
+        e.status, e.created_at, e.updated_at,
+        d.name as department_name
+    FROM employees e
+    LEFT JOIN departments d ON e.department_id = d.id
+    WHERE e.id = %s
+"""
+
+ARCHIVED_EMPLOYEE_DETAIL_SQL = """
+    SELECT 
+        e.id, e.name, e.email, e.phone,
+        e.department_id, e.salary, e.join_date,
+        e.status, e.created_at, e.updated_at, e.archived_at,
+        d.name as department_name
+    FROM employees_archive e
+    LEFT JOIN departments d ON e.department_id = d.id
+    WHERE e.id = %s
+"""
+
+EMAIL_EXISTS_SQL = "SELECT id FROM employees WHERE email = %s"
+
+DEPARTMENT_EXISTS_SQL = "SELECT id FROM departments WHERE id = %s"
+
+EMPLOYEE_STATE_SQL = (
+    "SELECT id, department_id, join_date, created_at, status FROM employees WHERE id = %s"
+)
+
+STATS_ACTIVE_SQL = "SELECT COUNT(*) as total FROM employees WHERE status = 'active'"
+
+STATS_BY_DEPARTMENT_SQL = """
+    SELECT 
+        d.id, d.name, 
+        COUNT(e.id) as employee_count
+    FROM departments d
+    LEFT JOIN employees e ON d.id = e.department_id 
+        AND e.status = 'active'
+    GROUP BY d.id, d.name
+    ORDER BY employee_count DESC
+"""
+
+STATS_RECENT_HIRES_SQL = """
+    SELECT COUNT(*) as recent 
+    FROM employees 
+    WHERE join_date >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)
+        AND status = 'active'
+"""
+
+STATS_INACTIVE_SQL = "SELECT COUNT(*) as inactive FROM employees WHERE status = 'inactive'"
+
+STATS_ARCHIVED_SQL = "SELECT COUNT(*) as archived FROM employees_archive"
+
+# Keyset page of rows changed after (changed_at, id); archived rows count
+# as changed when they were archived
+_CHANGES_BRANCH = """
+    (SELECT
+        e.id, e.name, e.email, e.phone,
+        e.department_id, e.salary, e.join_date,
+        e.status, e.created_at, e.{changed} AS changed_at,
+        d.name as department_name
+    FROM {table} e
+    LEFT JOIN departments d ON e.department_id = d.id
+    WHERE e.{changed} >= %s AND (e.{changed} > %s OR e.id > %s)
+    ORDER BY e.{changed}, e.id
+    LIMIT %s)
+"""
+CHANGES_SQL = (
+    _CHANGES_BRANCH.format(table='employees', changed='updated_at')
+    + " UNION ALL "
+    + _CHANGES_BRANCH.format(table='employees_archive', changed='archived_at')
+    + " ORDER BY changed_at, id LIMIT %s"
+)
+
 def require_auth(f):
     """Decorator to require authentication"""
     def decorated_function(*args, **kwargs):
@@ -33,12 +125,79 @@ def require_auth(f):
                 'message': 'Invalid or expired token'
             }), 401
         
+        if not tenants.is_known(payload.get('tenant', Config.DEFAULT_TENANT)):
+            return jsonify({
+                'status': 'error',
+                'message': 'Unknown tenant'
+            }), 401
+        
         request.user = payload
         return f(*args, **kwargs)
     
     decorated_function.__name__ = f.__name__
     return decorated_function
 
+def require_operator(f):
+    """
+    Decorator for process-wide endpoints (metrics, profiler) that see every
+    tenant: they take Config.OPERATOR_TOKEN, never a tenant user's JWT
+    """
+    def decorated_function(*args, **kwargs):
+        if not Config.OPERATOR_TOKEN:
+            return jsonify({
+                'status': 'error',
+                'message': 'Operator endpoints are disabled'
+            }), 403
+        
+        token = request.headers.get(OPERATOR_TOKEN_HEADER, '')
+        if not hmac.compare_digest(token.encode(), Config.OPERATOR_TOKEN.encode()):
+            return jsonify({
+                'status': 'error',
+                'message': f'Operator token required in {OPERATOR_TOKEN_HEADER}'
+            }), 401
+        
+        return f(*args, **kwargs)
+    
+    decorated_function.__name__ = f.__name__
+    return decorated_function
+
+def _auth_scope():
+    """Visibility scope of the current user (every user is an admin of their tenant)"""
+    return (tenants.current_tenant(), 'admin')
+
+def coalesced_response(build_payload, request_key, fmt=formats.JSON):
+    """
+    Serve a read through the single-flight layer.
+
+    Concurrent requests with the same path, request_key, response format,
+    auth scope and read routing share one call to build_payload() and the
+    serialized response bytes. request_key is the handler's parsed request
+    (e.g. the compiled query and its params, or the ordered ids), so two
+    query strings share an execution only when they ask for the same thing.
+    """
+    return coalesced_body(lambda: formats.encode(build_payload(), fmt), request_key, fmt)
+
+def coalesced_body(build_body, request_key, fmt=formats.JSON):
+    """coalesced_response() for handlers that encode the body themselves"""
+    from app import client_last_write, current_session
+    import db
+    # Sessions pinned to the primary must not share a replica read
+    key = (request.path, request_key, fmt, _auth_scope(),
+           db.get_router().requires_primary(current_session(), client_last_write()))
+
+    body = employees_flight.do(key, build_body)
+    return Response(body, status=200, mimetype=formats.MIMETYPES[fmt])
+
+def _negotiate_or_406():
+    """Response format for this request, or a 406 error response"""
+    try:
+        return formats.negotiate(), None
+    except formats.UnsupportedFormat as e:
+        return None, (jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 406)
+
 # ============================================================
 # READ Operations
 # ============================================================
@@ -48,83 +207,181 @@ def require_auth(f):
 def get_all_employees():
     """
     Get all employees with optional filters
-    GET /api/employees?department_id=1&status=active&search=john
+    GET /api/employees?department_id=1,2&status=active&search=john
+        &salary_min=40000&salary_max=90000&joined_from=2023-01-01&joined_to=2023-12-31
+        &sort=-salary,name&limit=50&offset=0
+    Compact output: ?format=columnar|msgpack (or the matching Accept header)
     """
     try:
-        from app import get_db_connection
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Get query parameters
-        department_id = request.args.get('department_id')
-        status = request.args.get('status', 'active')
-        search = request.args.get('search', '')
+        try:
+            query = EmployeeQuery.from_args(request.args)
+        except QueryError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 400
         
-        # Build query
-        query = """
-            SELECT 
-                e.id, e.name, e.email, e.phone, 
-                e.department_id, e.salary, e.join_date, 
-                e.status, e.created_at,
-                d.name as department_name
-            FROM employees e
-            LEFT JOIN departments d ON e.department_id = d.id
-            WHERE 1=1
-        """
-        params = []
+        fmt, error = _negotiate_or_406()
+        if error:
+            return error
         
-        if status:
-            query += " AND e.status = %s"
-            params.append(status)
+        try:
+            sql, params = query.compile()
+            return coalesced_body(
+                lambda: _list_employees(query, fmt), (sql, tuple(params)), fmt
+            )
+        except formats.BudgetExceeded as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 413
         
-        if department_id:
-            query += " AND e.department_id = %s"
-            params.append(department_id)
+    except Exception as e:
+        return error_response(e)
+
+def _format_list_dates(employees):
+    for emp in employees:
+        if emp['join_date']:
+            emp['join_date'] = emp['join_date'].strftime('%Y-%m-%d')
+        if emp['created_at']:
+            emp['created_at'] = emp['created_at'].strftime('%Y-%m-%d %H:%M:%S')
+    return employees
+
+def _list_employees(query, fmt=formats.JSON):
+    """
+    Run a compiled employee list query and return the encoded body.
+    Rows are streamed from an unbuffered cursor and encoded chunk by chunk
+    within Config.LIST_MAX_ROWS / LIST_MAX_BYTES.
+    """
+    from app import get_db_connection
+    if query.limit is None:
+        # One row past the budget is enough to know it was exceeded
+        query = EmployeeQuery(query.filters, query.sort, Config.LIST_MAX_ROWS + 1)
+    sql, params = query.compile()
+    budget = dict(
+        fetch_size=Config.LIST_FETCH_SIZE,
+        max_rows=Config.LIST_MAX_ROWS,
+        max_bytes=Config.LIST_MAX_BYTES
+    )
+    
+    conn = get_db_connection(readonly=True)
+    cursor = None
+    try:
+        if fmt != formats.JSON:
+            # Compact formats encode straight from tuples
+            cursor = conn.cursor(pymysql.cursors.SSCursor)
+            cursor.execute(sql, params)
+            return formats.list_body(
+                cursor, fmt, 'rows',
+                extra={'columns': [d[0] for d in cursor.description]},
+                convert=lambda rows: formats.columnar(cursor, rows)['rows'],
+                **budget
+            )
+        
+        cursor = conn.cursor(pymysql.cursors.SSDictCursor)
+        cursor.execute(sql, params)
+        return formats.list_body(
+            cursor, fmt, 'employees', convert=_format_list_dates, **budget
+        )
+    finally:
+        if cursor:
+            cursor.close()
+        conn.close()
+
+@employees_bp.route('/<int:emp_id>', methods=['GET'])
+@require_auth
+def get_employee(emp_id):
+    """
+    Get single employee by ID
+    GET /api/employees/1
+    """
+    try:
+        from app import get_db_connection
+        conn = get_db_connection(readonly=True)
+        cursor = conn.cursor()
         
-        if search:
-            query += " AND (e.name LIKE %s OR e.email LIKE %s)"
-            search_param = f"%{search}%"
-            params.extend([search_param, search_param])
+        cursor.execute(EMPLOYEE_DETAIL_SQL, (emp_id,))
         
-        query += " ORDER BY e.created_at DESC"
+        employee = cursor.fetchone()
         
-        cursor.execute(query, params)
-        employees = cursor.fetchall()
+        # Fall back to the archive for long-inactive employees
+        if not employee:
+            cursor.execute(ARCHIVED_EMPLOYEE_DETAIL_SQL, (emp_id,))
+            employee = cursor.fetchone()
+        conn.close()
         
-        # Format dates
-        for emp in employees:
-            if emp['join_date']:
-                emp['join_date'] = emp['join_date'].strftime('%Y-%m-%d')
-            if emp['created_at']:
-                emp['created_at'] = emp['created_at'].strftime('%Y-%m-%d %H:%M:%S')
+        if not employee:
+            return jsonify({
+                'status': 'error',
+                'message': 'Employee not found'
+            }), 404
         
-        conn.close()
+        _format_employee_dates(employee)
         
         return jsonify({
             'status': 'success',
-            'count': len(employees),
-            'employees': employees
+            'employee': employee
         }), 200
         
     except Exception as e:
-        return jsonify({
-            'status': 'error',
-            'message': str(e)
-        }), 500
+        return error_response(e)
 
-@employees_bp.route('/<int:emp_id>', methods=['GET'])
+def _format_employee_dates(employee):
+    """Format the date columns of a single-employee row in place"""
+    if employee.get('archived_at'):
+        employee['archived_at'] = employee['archived_at'].strftime('%Y-%m-%d %H:%M:%S')
+    if employee['join_date']:
+        employee['join_date'] = employee['join_date'].strftime('%Y-%m-%d')
+    if employee['created_at']:
+        employee['created_at'] = employee['created_at'].strftime('%Y-%m-%d %H:%M:%S')
+    if employee['updated_at']:
+        employee['updated_at'] = employee['updated_at'].strftime('%Y-%m-%d %H:%M:%S')
+
+@employees_bp.route('/batch', methods=['GET'])
 @require_auth
-def get_employee(emp_id):
+def get_employees_batch():
     """
-    Get single employee by ID
-    GET /api/employees/1
+    Get several employees by ID in one request
+    GET /api/employees/batch?ids=3,1,2
+    Employees are returned in request order; unknown IDs are listed in "missing".
     """
     try:
-        from app import get_db_connection
-        conn = get_db_connection()
+        raw_ids = ','.join(request.args.getlist('ids')).split(',')
+        try:
+            ids = list(dict.fromkeys(int(i) for i in raw_ids if i.strip()))
+        except ValueError:
+            return jsonify({
+                'status': 'error',
+                'message': 'ids must be a comma-separated list of integers'
+            }), 400
+        
+        if not ids:
+            return jsonify({
+                'status': 'error',
+                'message': 'No ids provided'
+            }), 400
+        
+        if len(ids) > Config.BATCH_MAX_IDS:
+            return jsonify({
+                'status': 'error',
+                'message': f'At most {Config.BATCH_MAX_IDS} ids per request'
+            }), 400
+        
+        # Order matters: employees come back in request order
+        return coalesced_response(lambda: _load_employees_batch(ids), tuple(ids))
+        
+    except Exception as e:
+        return error_response(e)
+
+def _load_employees_batch(ids):
+    """Fetch employees by ID with one IN query (plus one for the archive)"""
+    from app import get_db_connection
+    conn = get_db_connection(readonly=True)
+    try:
         cursor = conn.cursor()
         
-        cursor.execute("""
+        placeholders = ', '.join(['%s'] * len(ids))
+        cursor.execute(f"""
             SELECT 
                 e.id, e.name, e.email, e.phone,
                 e.department_id, e.salary, e.join_date,
@@ -132,36 +389,125 @@ def get_employee(emp_id):
                 d.name as department_name
             FROM employees e
             LEFT JOIN departments d ON e.department_id = d.id
-            WHERE e.id = %s
-        """, (emp_id,))
-        
-        employee = cursor.fetchone()
+            WHERE e.id IN ({placeholders})
+        """, ids)
+        found = {row['id']: row for row in cursor.fetchall()}
+        
+        # Fall back to the archive for long-inactive employees
+        not_found = [i for i in ids if i not in found]
+        if not_found:
+            placeholders = ', '.join(['%s'] * len(not_found))
+            cursor.execute(f"""
+                SELECT 
+                    e.id, e.name, e.email, e.phone,
+                    e.department_id, e.salary, e.join_date,
+                    e.status, e.created_at, e.updated_at, e.archived_at,
+                    d.name as department_name
+                FROM employees_archive e
+                LEFT JOIN departments d ON e.department_id = d.id
+                WHERE e.id IN ({placeholders})
+            """, not_found)
+            found.update((row['id'], row) for row in cursor.fetchall())
+    finally:
         conn.close()
-        
-        if not employee:
+    
+    employees = []
+    missing = []
+    for emp_id in ids:
+        employee = found.get(emp_id)
+        if employee:
+            _format_employee_dates(employee)
+            employees.append(employee)
+        else:
+            missing.append(emp_id)
+    
+    return {
+        'status': 'success',
+        'count': len(employees),
+        'employees': employees,
+        'missing': missing
+    }
+
+@employees_bp.route('/changes', methods=['GET'])
+@require_auth
+def get_employee_changes():
+    """
+    Employees (any status, archived included) changed since a watermark,
+    for clients that keep a local copy
+    GET /api/employees/changes?updated_since=2024-01-01 10:00:00&after_id=0&limit=5000
+    Omit updated_since for a full sync. Pass the returned "next" values on
+    the following call; keep paging while "has_more" is true. The last page's
+    watermark overlaps recent changes, so clients must upsert by id.
+    Compact output: ?format=columnar|msgpack (or the matching Accept header)
+    """
+    try:
+        try:
+            since = request.args.get('updated_since') or '1970-01-01 00:00:01'
+            datetime.strptime(since, '%Y-%m-%d %H:%M:%S')
+            after_id = int(request.args.get('after_id') or 0)
+            limit = int(request.args.get('limit') or Config.CHANGES_MAX_LIMIT)
+            if after_id < 0 or not 1 <= limit <= Config.CHANGES_MAX_LIMIT:
+                raise ValueError
+        except ValueError:
             return jsonify({
                 'status': 'error',
-                'message': 'Employee not found'
-            }), 404
+                'message': (
+                    'updated_since must be YYYY-MM-DD HH:MM:SS, after_id >= 0 and '
+                    f'limit 1-{Config.CHANGES_MAX_LIMIT}'
+                )
+            }), 400
         
-        # Format dates
-        if employee['join_date']:
-            employee['join_date'] = employee['join_date'].strftime('%Y-%m-%d')
-        if employee['created_at']:
-            employee['created_at'] = employee['created_at'].strftime('%Y-%m-%d %H:%M:%S')
-        if employee['updated_at']:
-            employee['updated_at'] = employee['updated_at'].strftime('%Y-%m-%d %H:%M:%S')
+        fmt, error = _negotiate_or_406()
+        if error:
+            return error
         
-        return jsonify({
-            'status': 'success',
-            'employee': employee
-        }), 200
+        return Response(
+            formats.encode(_load_changes(since, after_id, limit, fmt), fmt),
+            mimetype=formats.MIMETYPES[fmt]
+        )
         
     except Exception as e:
-        return jsonify({
-            'status': 'error',
-            'message': str(e)
-        }), 500
+        return error_response(e)
+
+def _load_changes(since, after_id, limit, fmt):
+    from app import get_db_connection
+    conn = get_db_connection(readonly=True)
+    try:
+        cursor = conn.cursor(pymysql.cursors.Cursor)
+        # Anything committed later with an older timestamp is newer than this,
+        # so the final watermark steps back to pick it up next time
+        cursor.execute(
+            "SELECT NOW() - INTERVAL %s SECOND", (Config.CHANGES_OVERLAP_SECONDS,)
+        )
+        watermark = cursor.fetchone()[0]
+        
+        branch = [since, since, after_id, limit + 1]
+        cursor.execute(CHANGES_SQL, branch + branch + [limit + 1])
+        rows = cursor.fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        table = formats.columnar(cursor, rows)
+    finally:
+        conn.close()
+    
+    changed_at = table['columns'].index('changed_at')
+    if has_more:
+        last = table['rows'][-1]
+        next_page = {'updated_since': last[changed_at], 'after_id': last[0]}
+    else:
+        next_page = {'updated_since': watermark.strftime('%Y-%m-%d %H:%M:%S'), 'after_id': 0}
+    
+    payload = {
+        'status': 'success',
+        'count': len(rows),
+        'has_more': has_more,
+        'next': next_page
+    }
+    if fmt == formats.JSON:
+        payload['employees'] = [dict(zip(table['columns'], row)) for row in table['rows']]
+    else:
+        payload.update(table)
+    return payload
 
 # ============================================================
 # CREATE Operation
@@ -199,7 +545,7 @@ def create_employee():
         cursor = conn.cursor()
         
         # Check if email exists
-        cursor.execute("SELECT id FROM employees WHERE email = %s", (data['email'],))
+        cursor.execute(EMAIL_EXISTS_SQL, (data['email'],))
         if cursor.fetchone():
             conn.close()
             return jsonify({
@@ -208,7 +554,7 @@ def create_employee():
             }), 400
         
         # Check if department exists
-        cursor.execute("SELECT id FROM departments WHERE id = %s", (data['department_id'],))
+        cursor.execute(DEPARTMENT_EXISTS_SQL, (data['department_id'],))
         if not cursor.fetchone():
             conn.close()
             return jsonify({
@@ -232,6 +578,16 @@ def create_employee():
         ))
         
         emp_id = cursor.lastrowid
+        
+        # Keep the hiring time series current in the same transaction, from
+        # the row as stored (MySQL accepts more join_date spellings than
+        # YYYY-MM-DD)
+        import timeseries
+        cursor.execute(EMPLOYEE_STATE_SQL, (emp_id,))
+        timeseries.record_created(cursor, cursor.fetchone())
+        import outbox
+        outbox.record_event(cursor, emp_id, outbox.CREATED)
+        
         conn.commit()
         conn.close()
         
@@ -242,10 +598,7 @@ def create_employee():
         }), 201
         
     except Exception as e:
-        return jsonify({
-            'status': 'error',
-            'message': str(e)
-        }), 500
+        return error_response(e)
 
 # ============================================================
 # UPDATE Operation
@@ -273,8 +626,9 @@ def update_employee(emp_id):
         cursor = conn.cursor()
         
         # Check if employee exists
-        cursor.execute("SELECT id FROM employees WHERE id = %s", (emp_id,))
-        if not cursor.fetchone():
+        cursor.execute(EMPLOYEE_STATE_SQL, (emp_id,))
+        before = cursor.fetchone()
+        if not before:
             conn.close()
             return jsonify({
                 'status': 'error',
@@ -300,7 +654,7 @@ def update_employee(emp_id):
         
         # Check department if updating
         if 'department_id' in data:
-            cursor.execute("SELECT id FROM departments WHERE id = %s", (data['department_id'],))
+            cursor.execute(DEPARTMENT_EXISTS_SQL, (data['department_id'],))
             if not cursor.fetchone():
                 conn.close()
                 return jsonify({
@@ -312,6 +666,14 @@ def update_employee(emp_id):
         query = f"UPDATE employees SET {', '.join(fields)} WHERE id = %s"
         
         cursor.execute(query, params)
+        
+        import timeseries
+        cursor.execute(EMPLOYEE_STATE_SQL, (emp_id,))
+        after = cursor.fetchone()
+        timeseries.record_updated(cursor, before, after)
+        import outbox
+        outbox.record_event(cursor, emp_id, outbox.UPDATED)
+        
         conn.commit()
         conn.close()
         
@@ -321,10 +683,7 @@ def update_employee(emp_id):
         }), 200
         
     except Exception as e:
-        return jsonify({
-            'status': 'error',
-            'message': str(e)
-        }), 500
+        return error_response(e)
 
 # ============================================================
 # DELETE Operation
@@ -343,7 +702,7 @@ def delete_employee(emp_id):
         cursor = conn.cursor()
         
         # Check if employee exists
-        cursor.execute("SELECT id, status FROM employees WHERE id = %s", (emp_id,))
+        cursor.execute(EMPLOYEE_STATE_SQL, (emp_id,))
         employee = cursor.fetchone()
         
         if not employee:
@@ -365,6 +724,12 @@ def delete_employee(emp_id):
             "UPDATE employees SET status = 'inactive' WHERE id = %s",
             (emp_id,)
         )
+        
+        import timeseries
+        timeseries.record_deactivated(cursor, employee)
+        import outbox
+        outbox.record_event(cursor, emp_id, outbox.DEACTIVATED)
+        
         conn.commit()
         conn.close()
         
@@ -374,10 +739,7 @@ def delete_employee(emp_id):
         }), 200
         
     except Exception as e:
-        return jsonify({
-            'status': 'error',
-            'message': str(e)
-        }), 500
+        return error_response(e)
 
 # ============================================================
 # STATISTICS
@@ -389,60 +751,58 @@ def get_stats():
     """
     Get employee statistics
     GET /api/employees/stats
+    Compact by_department table: ?format=columnar|msgpack
     """
     try:
-        from app import get_db_connection
-        conn = get_db_connection()
+        fmt, error = _negotiate_or_406()
+        if error:
+            return error
+        
+        return coalesced_response(lambda: _compute_stats(fmt), (), fmt)
+        
+    except Exception as e:
+        return error_response(e)
+
+def _compute_stats(fmt=formats.JSON):
+    """Run the statistics queries"""
+    from app import get_db_connection
+    conn = get_db_connection(readonly=True)
+    try:
         cursor = conn.cursor()
         
         # Total employees
-        cursor.execute(
-            "SELECT COUNT(*) as total FROM employees WHERE status = 'active'"
-        )
+        cursor.execute(STATS_ACTIVE_SQL)
         total = cursor.fetchone()['total']
         
         # By department
-        cursor.execute("""
-            SELECT 
-                d.id, d.name, 
-                COUNT(e.id) as employee_count
-            FROM departments d
-            LEFT JOIN employees e ON d.id = e.department_id 
-                AND e.status = 'active'
-            GROUP BY d.id, d.name
-            ORDER BY employee_count DESC
-        """)
-        by_department = cursor.fetchall()
+        if fmt == formats.JSON:
+            cursor.execute(STATS_BY_DEPARTMENT_SQL)
+            by_department = cursor.fetchall()
+        else:
+            rows_cursor = conn.cursor(pymysql.cursors.Cursor)
+            rows_cursor.execute(STATS_BY_DEPARTMENT_SQL)
+            by_department = formats.columnar(rows_cursor)
         
         # Recent hires (last 30 days)
-        cursor.execute("""
-            SELECT COUNT(*) as recent 
-            FROM employees 
-            WHERE join_date >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)
-                AND status = 'active'
-        """)
+        cursor.execute(STATS_RECENT_HIRES_SQL)
         recent = cursor.fetchone()['recent']
         
         # Inactive employees
-        cursor.execute(
-            "SELECT COUNT(*) as inactive FROM employees WHERE status = 'inactive'"
-        )
+        cursor.execute(STATS_INACTIVE_SQL)
         inactive = cursor.fetchone()['inactive']
         
+        # Archived employees
+        cursor.execute(STATS_ARCHIVED_SQL)
+        inactive += cursor.fetchone()['archived']
+    finally:
         conn.close()
-        
-        return jsonify({
-            'status': 'success',
-            'stats': {
-                'total_active': total,
-                'total_inactive': inactive,
-                'recent_hires_30_days': recent,
-                'by_department': by_department
-            }
-        }), 200
-        
-    except Exception as e:
-        return jsonify({
-            'status': 'error',
-            'message': str(e)
-        }), 500
\ No newline at end of file
+    
+    return {
+        'status': 'success',
+        'stats': {
+            'total_active': total,
+            'total_inactive': inactive,
+            'recent_hires_30_days': recent,
+            'by_department': by_department
+        }
+    }
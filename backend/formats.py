@@ -0,0 +1,178 @@
+"""
+Compact response formats for large list payloads
+
+Clients opt in with ?format=columnar|msgpack or an Accept header:
+    application/vnd.employees.columnar+json   {"columns": [...], "rows": [[...]]}
+    application/msgpack                        the same structure as MessagePack
+Anything else gets the regular JSON response.
+
+Compact payloads are encoded straight from tuple cursor rows, without
+building a dict per row.
+
+List bodies are built with list_body(): rows are fetched, converted and
+encoded one chunk at a time, so a request holds at most one chunk of rows
+plus the encoded bytes, and both are capped by a row and byte budget.
+"""
+from flask import request, current_app
+from pymysql.constants import FIELD_TYPE
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+JSON = 'json'
+COLUMNAR = 'columnar'
+MSGPACK = 'msgpack'
+
+MIMETYPES = {
+    JSON: 'application/json',
+    COLUMNAR: 'application/vnd.employees.columnar+json',
+    MSGPACK: 'application/msgpack'
+}
+_ACCEPT = {
+    'application/vnd.employees.columnar+json': COLUMNAR,
+    'application/msgpack': MSGPACK,
+    'application/x-msgpack': MSGPACK
+}
+
+
+class UnsupportedFormat(ValueError):
+    """Requested format is unknown or its encoder is not installed"""
+
+
+class BudgetExceeded(Exception):
+    """A list response would exceed its row or byte budget"""
+
+
+def negotiate():
+    """Pick the response format for the current request"""
+    fmt = request.args.get('format')
+    if not fmt:
+        fmt = JSON
+        for mimetype, _ in request.accept_mimetypes:
+            if mimetype in _ACCEPT:
+                fmt = _ACCEPT[mimetype]
+                break
+            if mimetype in ('application/json', '*/*'):
+                break
+    if fmt not in MIMETYPES:
+        raise UnsupportedFormat(f'Unknown format {fmt!r}; use one of: {", ".join(MIMETYPES)}')
+    if fmt == MSGPACK and msgpack is None:
+        raise UnsupportedFormat('MessagePack responses require the msgpack package')
+    return fmt
+
+
+def _date(value):
+    return value.strftime('%Y-%m-%d') if value is not None else None
+
+
+def _datetime(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S') if value is not None else None
+
+
+def _decimal(value):
+    # Same representation the JSON responses use
+    return str(value) if value is not None else None
+
+
+_CONVERTERS = {
+    FIELD_TYPE.DATE: _date,
+    FIELD_TYPE.DATETIME: _datetime,
+    FIELD_TYPE.TIMESTAMP: _datetime,
+    FIELD_TYPE.NEWDECIMAL: _decimal,
+    FIELD_TYPE.DECIMAL: _decimal
+}
+
+
+def columnar(cursor, rows=None):
+    """
+    {'columns': [...], 'rows': [[...]]} from a tuple cursor's result.
+    Only columns that need conversion (dates, decimals) are touched.
+    """
+    columns = [d[0] for d in cursor.description]
+    converters = [
+        (i, _CONVERTERS[d[1]]) for i, d in enumerate(cursor.description)
+        if d[1] in _CONVERTERS
+    ]
+    if rows is None:
+        rows = cursor.fetchall()
+
+    if converters:
+        converted = []
+        for row in rows:
+            row = list(row)
+            for i, convert in converters:
+                row[i] = convert(row[i])
+            converted.append(row)
+        rows = converted
+
+    return {'columns': columns, 'rows': rows}
+
+
+def encode(payload, fmt):
+    """Serialize a response payload in the negotiated format"""
+    if fmt == MSGPACK:
+        return msgpack.packb(payload, use_bin_type=True)
+    return current_app.json.dumps(payload).encode('utf-8')
+
+
+def iter_list_chunks(cursor, fmt, fetch_size, convert=None):
+    """
+    Fetch rows fetch_size at a time, convert and encode each chunk.
+    Yields (row_count, encoded_bytes); the pieces concatenate into the
+    elements of one array.
+    """
+    packer = msgpack.Packer(use_bin_type=True) if fmt == MSGPACK else None
+    separator = b''
+    while True:
+        rows = cursor.fetchmany(fetch_size)
+        if not rows:
+            return
+        if convert:
+            rows = convert(rows)
+        if packer:
+            yield len(rows), b''.join(packer.pack(row) for row in rows)
+        else:
+            # "[a, b]" -> "a, b", joined to the previous chunk with a comma
+            yield len(rows), separator + current_app.json.dumps(rows)[1:-1].encode('utf-8')
+            separator = b', '
+
+
+def list_body(cursor, fmt, key, fetch_size, max_rows, max_bytes, extra=None, convert=None):
+    """
+    Encode {'status', 'count', **extra, key: [rows]} from an executed
+    (ideally unbuffered) cursor. Returns the body as a list of byte strings.
+    Raises BudgetExceeded as soon as either budget is crossed.
+
+    The whole encoded body is kept (it is shared by coalesced requests and
+    a 413 must be decided before anything is sent), so peak memory is up
+    to max_bytes plus one fetched chunk.
+    """
+    parts = []
+    count = size = 0
+    for rows, data in iter_list_chunks(cursor, fmt, fetch_size, convert):
+        count += rows
+        size += len(data)
+        if count > max_rows:
+            raise BudgetExceeded(
+                f'More than {max_rows} rows match; narrow the filters or page with limit/offset'
+            )
+        if size > max_bytes:
+            raise BudgetExceeded(
+                f'Response would exceed {max_bytes // 1024} KB; '
+                'narrow the filters or page with limit/offset'
+            )
+        parts.append(data)
+
+    head = {'status': 'success', 'count': count, **(extra or {})}
+    if fmt == MSGPACK:
+        packer = msgpack.Packer(use_bin_type=True)
+        prefix = packer.pack_map_header(len(head) + 1) + b''.join(
+            packer.pack(k) + packer.pack(v) for k, v in head.items()
+        ) + packer.pack(key) + packer.pack_array_header(count)
+        return [prefix] + parts
+
+    # '{"count": 2, "status": "success"}' -> '{"count": 2, "status": "success", "key": ['
+    prefix = current_app.json.dumps(head)[:-1] + f', "{key}": ['
+    return [prefix.encode('utf-8')] + parts + [b']}']
@@ -0,0 +1,191 @@
+"""
+Structured JSON logging with request IDs
+
+Records are formatted and written by a background listener thread; request
+threads only put them on a bounded queue and never block on stdout. When
+the queue is full, records are dropped and counted instead.
+"""
+from flask import g, has_request_context, request, jsonify
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+from config import Config
+import db
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+
+_STANDARD_ATTRS = set(
+    logging.LogRecord('', 0, '', 0, '', (), None).__dict__
+) | {'message', 'asctime', 'request_id'}
+_VALID_REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+logger = logging.getLogger(__name__)
+
+
+def get_request_id():
+    """ID of the request being handled, or None outside a request"""
+    if has_request_context():
+        return g.get('request_id')
+    return None
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, including any `extra=` fields"""
+
+    def format(self, record):
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created))
+                  + '.%03dZ' % record.msecs,
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None)
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp records with the current request ID (runs in the caller thread)"""
+
+    def filter(self, record):
+        if not getattr(record, 'request_id', None):
+            record.request_id = get_request_id()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of high-volume events.
+    rates maps the record's `event` extra field to a keep probability.
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record):
+        rate = self.rates.get(getattr(record, 'event', None))
+        if rate is None or rate >= 1:
+            return True
+        if random.random() >= rate:
+            return False
+        record.sample_rate = rate
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records instead of blocking"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Render the message and traceback now, while the frames still exist;
+        # JSON formatting happens on the listener thread.
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_handler = None
+_listener = None
+
+
+def setup_logging():
+    """Route the root logger through the queue (idempotent)"""
+    global _handler, _listener
+    if _handler:
+        return
+
+    log_queue = queue.Queue(maxsize=Config.LOG_QUEUE_SIZE)
+    _handler = NonBlockingQueueHandler(log_queue)
+    _handler.addFilter(RequestIdFilter())
+    _handler.addFilter(SamplingFilter(Config.LOG_SAMPLE_RATES))
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JSONFormatter())
+    _listener = logging.handlers.QueueListener(log_queue, output)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    root = logging.getLogger()
+    root.handlers = [_handler]
+    root.setLevel(Config.LOG_LEVEL)
+
+
+def init_app(app):
+    """Assign request IDs and log one access line per request"""
+    setup_logging()
+
+    @app.before_request
+    def assign_request_id():
+        incoming = request.headers.get(REQUEST_ID_HEADER, '')
+        g.request_id = incoming if _VALID_REQUEST_ID.match(incoming) else uuid.uuid4().hex
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def log_request(response):
+        response.headers[REQUEST_ID_HEADER] = g.get('request_id', '')
+        started = g.get('request_started')
+        logger.info('request', extra={
+            'event': 'http.request',
+            'method': request.method,
+            'path': request.path,
+            'tenant': getattr(request, 'user', {}).get('tenant'),
+            'status': response.status_code,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 2) if started else None
+        })
+        return response
+
+
+def error_response(exc, message='Internal server error', status=500):
+    """Log exc with its traceback and return an error carrying the request ID"""
+    if isinstance(exc, db.TenantBusy):
+        # Expected under load: the tenant should back off, not page anyone
+        logger.warning('Tenant connection limit reached', extra={'event': 'db.tenant_busy'})
+        return jsonify({
+            'status': 'error',
+            'message': 'Too many concurrent requests, retry shortly',
+            'request_id': get_request_id()
+        }), 503, {'Retry-After': '1'}
+    logger.error(message, exc_info=exc, extra={'event': 'request.error'})
+    return jsonify({
+        'status': 'error',
+        'message': message,
+        'request_id': get_request_id()
+    }), status
+
+
+def stats():
+    """Logging queue metrics"""
+    if not _handler:
+        return {}
+    return {
+        'queued': _handler.queue.qsize(),
+        'dropped': _handler.dropped
+    }
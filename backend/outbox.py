@@ -0,0 +1,362 @@
+"""
+Transactional outbox for employee change events
+
+Write handlers call record_* inside their own transaction, so an event
+exists if and only if the change was committed. A background dispatcher
+drains `employee_outbox` in batches to a pluggable sink, retrying with
+backoff and never delivering an employee's event before that employee's
+earlier events.
+
+`python app.py` starts the dispatcher; `python outbox.py dispatch` runs it
+on its own (e.g. next to a WSGI server). Run `python outbox.py` for a local
+HTTP stand-in consumer (OUTBOX_SINK = "http").
+"""
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+import pymysql
+from config import Config
+import db
+import tenants
+
+logger = logging.getLogger(__name__)
+
+CREATED = 'employee.created'
+UPDATED = 'employee.updated'
+DEACTIVATED = 'employee.deactivated'
+
+# Snapshot of the employee row as committed
+_EVENT_SELECT = """
+    SELECT id, %s, JSON_OBJECT(
+        'id', id, 'name', name, 'email', email, 'phone', phone,
+        'department_id', department_id, 'salary', salary,
+        'join_date', join_date, 'status', status
+    )
+    FROM employees
+"""
+
+# ============================================================
+# Recording (call inside the write transaction)
+# ============================================================
+
+def record_event(cursor, emp_id, event_type):
+    """Queue an event carrying the employee's current row"""
+    cursor.execute(
+        "INSERT INTO employee_outbox (employee_id, event_type, payload) "
+        + _EVENT_SELECT + " WHERE id = %s",
+        (event_type, emp_id)
+    )
+
+
+def record_created_by_email(cursor, emails):
+    """Queue created events for a batch of freshly inserted employees"""
+    if not emails:
+        return
+    placeholders = ', '.join(['%s'] * len(emails))
+    cursor.execute(
+        "INSERT INTO employee_outbox (employee_id, event_type, payload) "
+        + _EVENT_SELECT + f" WHERE email IN ({placeholders}) ORDER BY id",
+        [CREATED] + list(emails)
+    )
+
+# ============================================================
+# Sinks
+# ============================================================
+
+class FileSink:
+    """Append events as JSON lines"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def deliver(self, events):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for event in events:
+                f.write(json.dumps(event) + '\n')
+
+
+class HttpSink:
+    """POST each batch as a JSON array; any non-2xx response is a failure"""
+
+    def __init__(self, url, timeout=10):
+        self.url = url
+        self.timeout = timeout
+
+    def deliver(self, events):
+        req = urllib.request.Request(
+            self.url,
+            data=json.dumps(events).encode('utf-8'),
+            headers={'Content-Type': 'application/json'},
+            method='POST'
+        )
+        with urllib.request.urlopen(req, timeout=self.timeout):
+            pass
+
+
+class QueueSink:
+    """Put events on an in-process queue"""
+
+    def __init__(self, maxsize=0):
+        self.queue = queue.Queue(maxsize)
+
+    def deliver(self, events):
+        for event in events:
+            self.queue.put_nowait(event)
+
+
+def make_sink():
+    if Config.OUTBOX_SINK == 'http':
+        return HttpSink(Config.OUTBOX_HTTP_URL)
+    if Config.OUTBOX_SINK == 'queue':
+        return QueueSink()
+    return FileSink(Config.OUTBOX_FILE)
+
+# ============================================================
+# Dispatcher
+# ============================================================
+
+class Dispatcher:
+    """Drains the outbox to a sink in batches"""
+
+    LOCK_NAME = 'employee_outbox_dispatcher'
+
+    def __init__(self, sink):
+        self.sink = sink
+        self.delivered = 0
+        self.failed_batches = 0
+        self.lag_seconds = {}       # tenant -> age of its oldest undelivered event
+        self.last_error = None
+        self.last_delivery_at = None
+        self._purged_at = {}
+
+    def _fetch(self, cursor):
+        cursor.execute("""
+            SELECT id, employee_id, event_type, payload, created_at, attempts,
+                next_attempt_at IS NOT NULL AND next_attempt_at > NOW(3) AS waiting,
+                TIMESTAMPDIFF(MICROSECOND, created_at, NOW(3)) / 1000000 AS age
+            FROM employee_outbox
+            WHERE delivered_at IS NULL
+            ORDER BY id
+            LIMIT %s
+        """, (Config.OUTBOX_BATCH_SIZE,))
+        return cursor.fetchall()
+
+    def _deliverable(self, rows):
+        """Due events whose employee has no earlier undelivered event waiting"""
+        blocked = set()
+        ready = []
+        for row in rows:
+            if row['employee_id'] in blocked:
+                continue
+            if row['waiting']:
+                blocked.add(row['employee_id'])
+                continue
+            ready.append(row)
+        return ready
+
+    def drain_once(self, conn, tenant=Config.DEFAULT_TENANT):
+        """Deliver one batch of a tenant's events. Returns the number delivered."""
+        cursor = conn.cursor()
+        rows = self._fetch(cursor)
+        if rows:
+            self.lag_seconds[tenant] = float(rows[0]['age'])
+        else:
+            self.lag_seconds.pop(tenant, None)
+        ready = self._deliverable(rows)
+        if not ready:
+            conn.commit()
+            return 0
+
+        events = [
+            {
+                'id': row['id'],
+                'tenant': tenant,
+                'type': row['event_type'],
+                'employee_id': row['employee_id'],
+                'created_at': row['created_at'].strftime('%Y-%m-%d %H:%M:%S.%f'),
+                'payload': json.loads(row['payload'])
+            }
+            for row in ready
+        ]
+        ids = [row['id'] for row in ready]
+        placeholders = ', '.join(['%s'] * len(ids))
+
+        try:
+            self.sink.deliver(events)
+        except Exception as e:
+            self.failed_batches += 1
+            self.last_error = str(e)
+            delay = min(
+                Config.OUTBOX_RETRY_BASE * 2 ** min(row['attempts'] for row in ready),
+                Config.OUTBOX_RETRY_MAX
+            )
+            cursor.execute(f"""
+                UPDATE employee_outbox
+                SET attempts = attempts + 1,
+                    next_attempt_at = NOW(3) + INTERVAL %s SECOND,
+                    last_error = %s
+                WHERE id IN ({placeholders})
+            """, [delay, str(e)[:255]] + ids)
+            conn.commit()
+            logger.warning('Outbox delivery failed', extra={
+                'event': 'outbox.delivery_failed', 'tenant': tenant, 'events': len(ids),
+                'retry_in_seconds': delay, 'error': str(e)
+            })
+            return 0
+
+        cursor.execute(
+            f"UPDATE employee_outbox SET delivered_at = NOW(3) WHERE id IN ({placeholders})",
+            ids
+        )
+        conn.commit()
+        self.delivered += len(ids)
+        self.last_delivery_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        return len(ids)
+
+    def _purge(self, conn):
+        cursor = conn.cursor()
+        cursor.execute("""
+            DELETE FROM employee_outbox
+            WHERE delivered_at < NOW() - INTERVAL %s DAY
+            LIMIT 1000
+        """, (Config.OUTBOX_RETENTION_DAYS,))
+        conn.commit()
+
+    def _drain_tenant(self, tenant):
+        """One batch for one tenant. True if more events are probably waiting."""
+        conn = db.get_router().acquire(tenant=tenant)
+        try:
+            if time.monotonic() - self._purged_at.get(tenant, 0) > 3600:
+                self._purge(conn)
+                self._purged_at[tenant] = time.monotonic()
+            return self.drain_once(conn, tenant) >= Config.OUTBOX_BATCH_SIZE
+        finally:
+            conn.close()
+
+    def _connect_for_lock(self):
+        # Outside the pool: the lock is held for as long as this process
+        # dispatches, and must not take a pooled (or tenant) connection
+        return pymysql.connect(
+            host=Config.DB_HOST,
+            port=Config.DB_PORT,
+            user=Config.DB_USER,
+            password=Config.DB_PASSWORD,
+            cursorclass=pymysql.cursors.DictCursor,
+            autocommit=True
+        )
+
+    def _holds_lock(self, cursor):
+        """False once the lock is gone, e.g. after the server dropped the session"""
+        cursor.execute(
+            "SELECT IS_USED_LOCK(%s) = CONNECTION_ID() AS held", (self.LOCK_NAME,)
+        )
+        return bool(cursor.fetchone()['held'])
+
+    def run(self):
+        while True:
+            lock_conn = None
+            try:
+                # One dispatcher across all processes keeps per-employee order.
+                # Tenant databases share the server, so one lock covers them all.
+                lock_conn = self._connect_for_lock()
+                cursor = lock_conn.cursor()
+                cursor.execute("SELECT GET_LOCK(%s, 0) AS locked", (self.LOCK_NAME,))
+                if not cursor.fetchone()['locked']:
+                    lock_conn.close()
+                    lock_conn = None
+                    time.sleep(Config.OUTBOX_POLL_INTERVAL * 5)
+                    continue
+
+                # A lost connection releases the lock on the server, so stop
+                # dispatching as soon as it is no longer ours
+                while self._holds_lock(cursor):
+                    busy = False
+                    for tenant in tenants.all_tenants():
+                        try:
+                            busy = self._drain_tenant(tenant) or busy
+                        except Exception as e:
+                            # One tenant's failure must not hold up the others
+                            self.last_error = str(e)
+                            logger.error('Outbox dispatch failed', exc_info=e, extra={
+                                'event': 'outbox.dispatcher_error', 'tenant': tenant
+                            })
+                    if not busy:
+                        time.sleep(Config.OUTBOX_POLL_INTERVAL)
+                logger.warning('Outbox dispatcher lost its lock', extra={
+                    'event': 'outbox.lock_lost'
+                })
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error('Outbox dispatcher error', exc_info=e, extra={
+                    'event': 'outbox.dispatcher_error'
+                })
+                time.sleep(Config.OUTBOX_POLL_INTERVAL)
+            finally:
+                # Closing the session releases the lock
+                if lock_conn:
+                    try:
+                        lock_conn.close()
+                    except Exception:
+                        pass
+
+    def stats(self):
+        return {
+            'sink': type(self.sink).__name__,
+            'delivered': self.delivered,
+            'failed_batches': self.failed_batches,
+            'lag_seconds': round(max(self.lag_seconds.values(), default=0.0), 3),
+            'lag_seconds_by_tenant': {
+                tenant: round(lag, 3) for tenant, lag in self.lag_seconds.items()
+            },
+            'last_delivery_at': self.last_delivery_at,
+            'last_error': self.last_error
+        }
+
+
+dispatcher = None
+
+
+def start_dispatcher():
+    """Start the background dispatcher once per process"""
+    global dispatcher
+    if dispatcher is None:
+        dispatcher = Dispatcher(make_sink())
+        threading.Thread(target=dispatcher.run, daemon=True).start()
+    return dispatcher
+
+
+def stats():
+    return dispatcher.stats() if dispatcher else {'running': False}
+
+# ============================================================
+# Local HTTP stand-in consumer
+# ============================================================
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        events = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        for event in events:
+            print(f"{event['tenant']:<12} {event['id']:>8} {event['type']:<22} "
+                  f"employee {event['employee_id']}")
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] == ['dispatch']:
+        # Standalone dispatcher, for servers that do not run app.py directly
+        Dispatcher(make_sink()).run()
+
+    url = urllib.parse.urlparse(Config.OUTBOX_HTTP_URL)
+    print(f"Outbox stand-in consumer listening on {Config.OUTBOX_HTTP_URL}")
+    HTTPServer((url.hostname, url.port or 80), _StandInHandler).serve_forever()
@@ -0,0 +1,329 @@
+"""
+On-demand sampling profiler
+
+POST /api/admin/profile starts a session that samples request threads'
+stacks every few milliseconds with sys._current_frames() for N seconds,
+optionally only for a sampled fraction of requests to one route. GET
+returns the result as collapsed stacks (one "frame;frame;frame count" line
+per stack, the input format of flamegraph.pl and speedscope) together with
+the allocations tracemalloc saw during the session.
+
+While no session runs, the only cost is one None check per request.
+The profiler sees every tenant's requests, so it takes the operator token
+(Config.OPERATOR_TOKEN), not a tenant user's login.
+"""
+from flask import Blueprint, current_app, g, request, jsonify, Response
+from collections import Counter
+from datetime import datetime
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from config import Config
+from employees import require_operator
+from logging_config import error_response, get_request_id
+
+# Create Blueprint
+profile_bp = Blueprint('profile', __name__, url_prefix='/api/admin/profile')
+
+logger = logging.getLogger(__name__)
+
+_session = None        # running session, checked by the request hooks
+_last_session = None   # running or most recent session, for GET
+_session_lock = threading.Lock()
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def _collapse(frame):
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return ';'.join(labels)
+
+
+class ProfileSession:
+    """One profiling run and its results"""
+
+    def __init__(self, seconds, interval, endpoint=None, rate=1.0,
+                 all_threads=False, trace_allocations=True):
+        self.seconds = seconds
+        self.interval = interval
+        self.endpoint = endpoint
+        self.rate = rate
+        self.all_threads = all_threads
+        self.trace_allocations = trace_allocations
+        self.request_id = get_request_id()
+
+        self.threads = {}          # thread ident -> root label of a sampled request
+        self.stacks = Counter()
+        self.samples = 0
+        self.sampled_requests = 0
+        self.allocations = []
+        self.state = 'running'
+        self.started_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.finished_at = None
+        self._stop = threading.Event()
+
+    # -------- request hooks --------
+
+    def wants(self, endpoint):
+        if self.endpoint and endpoint != self.endpoint:
+            return False
+        return self.rate >= 1 or random.random() < self.rate
+
+    def enter(self, endpoint):
+        self.threads[threading.get_ident()] = endpoint or 'unknown'
+        self.sampled_requests += 1
+
+    def exit(self):
+        self.threads.pop(threading.get_ident(), None)
+
+    # -------- sampling --------
+
+    def _sample(self, own):
+        names = None
+        if self.all_threads and not self.endpoint:
+            names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            root = self.threads.get(ident)
+            if root is None:
+                if names is None:
+                    continue
+                root = f"thread:{names.get(ident, ident)}"
+            self.stacks[f"{root};{_collapse(frame)}"] += 1
+        self.samples += 1
+
+    def run(self):
+        global _session
+        own = threading.get_ident()
+        started_tracing = False
+        baseline = None
+        try:
+            if self.trace_allocations:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start(Config.PROFILE_TRACEMALLOC_FRAMES)
+                    started_tracing = True
+                baseline = tracemalloc.take_snapshot()
+
+            deadline = time.monotonic() + self.seconds
+            while time.monotonic() < deadline and not self._stop.is_set():
+                self._sample(own)
+                self._stop.wait(self.interval)
+
+            if baseline is not None:
+                self.allocations = self._allocation_diff(baseline)
+            self.state = 'completed'
+        except Exception as e:
+            self.state = 'failed'
+            logger.error('Profiling failed', exc_info=e, extra={
+                'event': 'profile.failed', 'request_id': self.request_id
+            })
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+            self.finished_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            with _session_lock:
+                _session = None
+
+    def _allocation_diff(self, baseline):
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        snapshot = tracemalloc.take_snapshot().filter_traces(ignore)
+        diff = snapshot.compare_to(baseline.filter_traces(ignore), 'lineno')
+        return [
+            {
+                'location': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                'size_kb': round(stat.size_diff / 1024, 1),
+                'count': stat.count_diff
+            }
+            for stat in diff[:Config.PROFILE_TRACEMALLOC_TOP]
+            if stat.size_diff > 0
+        ]
+
+    def stop(self):
+        self._stop.set()
+
+    # -------- results --------
+
+    def collapsed(self):
+        return ''.join(
+            f"{stack} {count}\n" for stack, count in self.stacks.most_common()
+        )
+
+    def summary(self):
+        return {
+            'state': self.state,
+            'endpoint': self.endpoint,
+            'rate': self.rate,
+            'seconds': self.seconds,
+            'interval_ms': round(self.interval * 1000, 3),
+            'all_threads': self.all_threads,
+            'samples': self.samples,
+            'sampled_requests': self.sampled_requests,
+            'distinct_stacks': len(self.stacks),
+            'request_id': self.request_id,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+
+def init_app(app):
+    """Attach sampled requests to the running session"""
+
+    @app.before_request
+    def profile_request():
+        session = _session
+        if session is None:
+            return
+        if session.wants(request.endpoint):
+            session.enter(request.endpoint)
+            g.profile_session = session
+
+    @app.teardown_request
+    def end_profile_request(exc):
+        session = g.pop('profile_session', None)
+        if session is not None:
+            session.exit()
+
+
+def _resolve_endpoint(name):
+    """Accept 'employees.get_all_employees' or just 'get_all_employees'"""
+    if name in current_app.view_functions:
+        return name
+    matches = [e for e in current_app.view_functions if e.split('.')[-1] == name]
+    return matches[0] if len(matches) == 1 else None
+
+# ============================================================
+# Routes
+# ============================================================
+
+@profile_bp.route('', methods=['POST'])
+@require_operator
+def start_profile():
+    """
+    Start a profiling session in the background
+    POST /api/admin/profile
+    Body (all optional):
+        {"seconds": 30, "interval_ms": 5, "endpoint": "get_all_employees",
+         "rate": 0.1, "all_threads": false, "allocations": true}
+    """
+    global _session, _last_session
+    try:
+        data = request.get_json(silent=True) or {}
+
+        seconds = data.get('seconds', 30)
+        interval_ms = data.get('interval_ms', Config.PROFILE_INTERVAL_MS)
+        rate = data.get('rate', 1.0)
+        if not isinstance(seconds, (int, float)) or not 0 < seconds <= Config.PROFILE_MAX_SECONDS:
+            return jsonify({
+                'status': 'error',
+                'message': f'seconds must be between 0 and {Config.PROFILE_MAX_SECONDS}'
+            }), 400
+        if not isinstance(interval_ms, (int, float)) or not 1 <= interval_ms <= 1000:
+            return jsonify({
+                'status': 'error',
+                'message': 'interval_ms must be between 1 and 1000'
+            }), 400
+        if not isinstance(rate, (int, float)) or not 0 < rate <= 1:
+            return jsonify({
+                'status': 'error',
+                'message': 'rate must be greater than 0 and at most 1'
+            }), 400
+
+        endpoint = None
+        if data.get('endpoint'):
+            endpoint = _resolve_endpoint(data['endpoint'])
+            if not endpoint:
+                return jsonify({
+                    'status': 'error',
+                    'message': f"Unknown endpoint {data['endpoint']!r}"
+                }), 400
+
+        with _session_lock:
+            if _session is not None:
+                return jsonify({
+                    'status': 'error',
+                    'message': 'A profiling session is already running'
+                }), 409
+            _session = _last_session = ProfileSession(
+                seconds,
+                interval_ms / 1000,
+                endpoint=endpoint,
+                rate=rate,
+                all_threads=bool(data.get('all_threads', False)),
+                trace_allocations=bool(data.get('allocations', True))
+            )
+            threading.Thread(target=_session.run, daemon=True).start()
+
+        logger.info('Profiling started', extra={
+            'event': 'profile.started', **_last_session.summary()
+        })
+        return jsonify({
+            'status': 'success',
+            'message': 'Profiling started',
+            'profile': _last_session.summary()
+        }), 202
+
+    except Exception as e:
+        return error_response(e)
+
+@profile_bp.route('', methods=['GET'])
+@require_operator
+def get_profile():
+    """
+    Result of the running or most recent session
+    GET /api/admin/profile                   summary, collapsed stacks and allocations
+    GET /api/admin/profile?format=collapsed  collapsed stacks only, as text
+    """
+    try:
+        session = _last_session
+        if session is None:
+            return jsonify({
+                'status': 'error',
+                'message': 'No profiling session has run yet'
+            }), 404
+
+        if request.args.get('format') == 'collapsed':
+            return Response(session.collapsed(), mimetype='text/plain')
+
+        return jsonify({
+            'status': 'success',
+            'profile': session.summary(),
+            'allocations': session.allocations,
+            'collapsed': session.collapsed()
+        })
+
+    except Exception as e:
+        return error_response(e)
+
+@profile_bp.route('', methods=['DELETE'])
+@require_operator
+def stop_profile():
+    """Stop the running session early; results stay available via GET"""
+    try:
+        session = _session
+        if session is None:
+            return jsonify({
+                'status': 'error',
+                'message': 'No profiling session is running'
+            }), 404
+
+        session.stop()
+        return jsonify({
+            'status': 'success',
+            'message': 'Profiling stopping',
+            'profile': session.summary()
+        })
+
+    except Exception as e:
+        return error_response(e)
@@ -0,0 +1,75 @@
+"""
+Request coalescing (single-flight) for identical concurrent reads
+"""
+import threading
+
+
+class _Call:
+    """One in-flight execution shared by every caller with the same key"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Run at most one execution per key at a time.
+
+    Callers that arrive while an execution for their key is still running
+    wait for it and receive the same result (or the same exception)
+    instead of running it again. Nothing is cached once the execution
+    finishes: the next caller starts a fresh one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._requests = 0
+        self._executions = 0
+
+    def do(self, key, fn):
+        """Return fn() for key, sharing the execution with concurrent callers"""
+        with self._lock:
+            self._requests += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self._executions += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+        return call.result
+
+    def stats(self):
+        """Coalescing metrics since process start"""
+        with self._lock:
+            requests = self._requests
+            executions = self._executions
+            in_flight = len(self._calls)
+
+        coalesced = requests - executions
+        return {
+            'requests': requests,
+            'executions': executions,
+            'coalesced': coalesced,
+            'coalescing_ratio': round(coalesced / requests, 4) if requests else 0.0,
+            'in_flight': in_flight
+        }
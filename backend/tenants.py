@@ -0,0 +1,55 @@
+"""
+Tenant resolution
+
+Each tenant's data lives in its own database (same schema) on the shared
+MySQL server, listed in Config.TENANTS. The tenant of a request comes from
+the `tenant` claim of its JWT; background work passes the tenant it was
+started for. With no TENANTS configured the app is single-tenant and
+everything belongs to Config.DEFAULT_TENANT on Config.DB_NAME.
+"""
+from flask import has_request_context, request
+from config import Config
+
+
+class UnknownTenant(LookupError):
+    """Tenant is not configured, or no tenant is known for this work"""
+
+
+def is_multi_tenant():
+    return bool(Config.TENANTS)
+
+
+def all_tenants():
+    """Every configured tenant, for work that runs across all of them"""
+    return list(Config.TENANTS) or [Config.DEFAULT_TENANT]
+
+
+def is_known(tenant):
+    if is_multi_tenant():
+        return tenant in Config.TENANTS
+    return tenant == Config.DEFAULT_TENANT
+
+
+def database_for(tenant):
+    """Database holding this tenant's tables"""
+    if not is_multi_tenant():
+        if tenant not in (None, Config.DEFAULT_TENANT):
+            raise UnknownTenant(f'Unknown tenant {tenant!r}')
+        return Config.DB_NAME
+    try:
+        return Config.TENANTS[tenant]['database']
+    except KeyError:
+        raise UnknownTenant(f'Unknown tenant {tenant!r}')
+
+
+def current_tenant():
+    """
+    Tenant of the authenticated request. Tokens issued before tenancy carry
+    no claim and belong to the default tenant. Outside a request there is no
+    implicit tenant unless the app is single-tenant.
+    """
+    if has_request_context() and hasattr(request, 'user'):
+        return request.user.get('tenant', Config.DEFAULT_TENANT)
+    if not is_multi_tenant():
+        return Config.DEFAULT_TENANT
+    raise UnknownTenant('No tenant given for work outside an authenticated request')
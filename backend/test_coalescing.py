@@ -0,0 +1,67 @@
+"""
+Request coalescing keys (employees.coalesced_body)
+
+Concurrent requests share one execution only when they ask for the same
+thing. The loaders are replaced by functions that wait on a barrier: two
+executions get through it together, a shared one times out.
+No database needed.
+Usage: python -m pytest test_coalescing.py
+"""
+import threading
+from auth import generate_token
+import app as app_module
+import employees
+import formats
+
+TIMEOUT = 5
+
+
+def get_concurrently(urls):
+    """Issue the requests at the same time and return their responses"""
+    headers = {'Authorization': f'Bearer {generate_token(1, "admin")}'}
+    responses = [None] * len(urls)
+
+    def fetch(i, url):
+        responses[i] = app_module.app.test_client().get(url, headers=headers)
+
+    threads = [threading.Thread(target=fetch, args=(i, url)) for i, url in enumerate(urls)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(TIMEOUT * 2)
+    return responses
+
+
+def test_empty_status_is_not_the_default_list(monkeypatch):
+    barrier = threading.Barrier(2, timeout=TIMEOUT)
+    seen = []
+
+    def list_employees(query, fmt=formats.JSON):
+        seen.append(query.filters.get('status'))
+        barrier.wait()
+        return formats.encode({'status': 'success', 'filters': str(query.filters)}, fmt)
+
+    monkeypatch.setattr(employees, '_list_employees', list_employees)
+    first, second = get_concurrently(['/api/employees', '/api/employees?status='])
+
+    assert first.status_code == second.status_code == 200
+    # ?status= means every status; no parameter means active only
+    assert len(seen) == 2 and set(seen) == {None, ('active',)}
+    assert first.get_json() != second.get_json()
+
+
+def test_batch_order_is_not_merged(monkeypatch):
+    barrier = threading.Barrier(2, timeout=TIMEOUT)
+
+    def load_batch(ids):
+        barrier.wait()
+        return {'status': 'success', 'ids': ids}
+
+    monkeypatch.setattr(employees, '_load_employees_batch', load_batch)
+    first, second = get_concurrently([
+        '/api/employees/batch?ids=2&ids=1',
+        '/api/employees/batch?ids=1&ids=2'
+    ])
+
+    assert first.get_json()['ids'] == [2, 1]
+    assert second.get_json()['ids'] == [1, 2]
@@ -0,0 +1,168 @@
+"""
+Memory bounds of the chunked list encoder (formats.list_body)
+
+Feeds synthetic rows through formats.list_body, the fetch/convert/encode
+path GET /api/employees uses, from a cursor that produces rows lazily the
+way an unbuffered pymysql cursor does. list_body keeps the encoded body,
+so a request's peak memory is its encoded size (at most LIST_MAX_BYTES)
+plus one chunk of rows in flight, never the decoded rows of the whole
+result. No database needed.
+Usage: python -m pytest test_memory_budget.py
+"""
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+import json
+import tracemalloc
+import pytest
+from flask import Flask
+from pymysql.constants import FIELD_TYPE
+import formats
+
+FETCH_SIZE = 500
+
+
+class LazyCursor:
+    """Generates rows on fetchmany, like pymysql's SSDictCursor (or SSCursor with tuples=True)"""
+
+    description = [
+        ('id', FIELD_TYPE.LONG), ('name', FIELD_TYPE.VAR_STRING),
+        ('email', FIELD_TYPE.VAR_STRING), ('phone', FIELD_TYPE.VAR_STRING),
+        ('department_id', FIELD_TYPE.LONG), ('salary', FIELD_TYPE.NEWDECIMAL),
+        ('join_date', FIELD_TYPE.DATE), ('status', FIELD_TYPE.VAR_STRING),
+        ('created_at', FIELD_TYPE.TIMESTAMP), ('department_name', FIELD_TYPE.VAR_STRING)
+    ]
+
+    def __init__(self, total, tuples=False):
+        self.total = total
+        self.tuples = tuples
+        self.produced = 0
+
+    def fetchmany(self, size):
+        rows = []
+        while len(rows) < size and self.produced < self.total:
+            i = self.produced
+            rows.append({
+                'id': i,
+                'name': f'Employee {i}',
+                'email': f'employee{i}@company.com',
+                'phone': f'98765{i:05d}',
+                'department_id': i % 6 + 1,
+                'salary': Decimal(40000 + i % 50000),
+                'join_date': date(2020, 1, 1) + timedelta(days=i % 1500),
+                'status': 'active',
+                'created_at': datetime(2020, 1, 1) + timedelta(minutes=i),
+                'department_name': 'Engineering'
+            })
+            if self.tuples:
+                rows[-1] = tuple(rows[-1].values())
+            self.produced += 1
+        return rows
+
+
+def format_dates(rows):
+    for row in rows:
+        row['join_date'] = row['join_date'].strftime('%Y-%m-%d')
+        row['created_at'] = row['created_at'].strftime('%Y-%m-%d %H:%M:%S')
+    return rows
+
+
+@pytest.fixture
+def app_context():
+    with Flask(__name__).app_context():
+        yield
+
+
+def peak_while(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def drain(total):
+    """Encode every row of one chunk-sized result, as a measure of one chunk in flight"""
+    for _ in formats.iter_list_chunks(LazyCursor(total), formats.JSON, FETCH_SIZE, format_dates):
+        pass
+
+
+def build_list(total):
+    return formats.list_body(
+        LazyCursor(total), formats.JSON, 'employees', FETCH_SIZE,
+        max_rows=10 ** 9, max_bytes=10 ** 9, convert=format_dates
+    )
+
+
+def test_peak_memory_is_encoded_size_plus_one_chunk(app_context):
+    chunk_peak = peak_while(lambda: drain(FETCH_SIZE * 4))
+    body_size = sum(len(part) for part in build_list(100000))
+
+    # The body itself grows with the rows (that is what LIST_MAX_BYTES
+    # caps), but decoded rows are only ever held one chunk at a time
+    assert peak_while(lambda: build_list(100000)) < body_size * 1.1 + 2 * chunk_peak
+
+
+def test_byte_budget_caps_peak_memory(app_context):
+    max_bytes = 4 * 1024 * 1024
+    chunk_peak = peak_while(lambda: drain(FETCH_SIZE * 4))
+
+    def build():
+        with pytest.raises(formats.BudgetExceeded):
+            formats.list_body(
+                LazyCursor(200000), formats.JSON, 'employees', FETCH_SIZE,
+                max_rows=10 ** 9, max_bytes=max_bytes, convert=format_dates
+            )
+
+    # The encoded bytes up to the budget plus one chunk in flight,
+    # far below the ~35 MB the full 200k rows would encode to
+    assert peak_while(build) < max_bytes + 2 * chunk_peak
+
+
+def test_row_budget(app_context):
+    cursor = LazyCursor(10 ** 6)
+    with pytest.raises(formats.BudgetExceeded, match='More than 2000 rows'):
+        formats.list_body(
+            cursor, formats.JSON, 'employees', FETCH_SIZE,
+            max_rows=2000, max_bytes=10 ** 9, convert=format_dates
+        )
+    # Stopped at the first chunk past the budget
+    assert cursor.produced == 2000 + FETCH_SIZE
+
+
+def test_body_matches_full_payload(app_context):
+    parts = formats.list_body(
+        LazyCursor(1234), formats.JSON, 'employees', FETCH_SIZE,
+        max_rows=10 ** 6, max_bytes=10 ** 9, convert=format_dates
+    )
+    body = json.loads(b''.join(parts))
+    expected = format_dates(LazyCursor(1234).fetchmany(1234))
+
+    assert body['status'] == 'success'
+    assert body['count'] == 1234
+    assert body['employees'] == json.loads(formats.encode(expected, formats.JSON))
+
+
+def test_empty_result(app_context):
+    parts = formats.list_body(
+        LazyCursor(0), formats.JSON, 'employees', FETCH_SIZE,
+        max_rows=10, max_bytes=10 ** 6
+    )
+    assert json.loads(b''.join(parts)) == {'status': 'success', 'count': 0, 'employees': []}
+
+
+@pytest.mark.skipif(formats.msgpack is None, reason='msgpack not installed')
+def test_msgpack_columnar_body(app_context):
+    cursor = LazyCursor(1200, tuples=True)
+    parts = formats.list_body(
+        cursor, formats.MSGPACK, 'rows', FETCH_SIZE,
+        max_rows=10 ** 6, max_bytes=10 ** 9,
+        extra={'columns': [d[0] for d in cursor.description]},
+        convert=lambda rows: formats.columnar(cursor, rows)['rows']
+    )
+    body = formats.msgpack.unpackb(b''.join(parts), raw=False)
+    assert body['count'] == 1200
+    assert body['columns'][0] == 'id'
+    assert len(body['rows']) == 1200
+    assert body['rows'][-1][0] == 1199
+    assert body['rows'][0][6] == '2020-01-01'
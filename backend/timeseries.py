@@ -0,0 +1,362 @@
+"""
+Hiring, exit and headcount time series
+
+Monthly buckets per department live in `employee_monthly_stats`. They are
+built once from the employees tables (POST /api/employees/timeseries/rebuild
+or `python timeseries.py`) and then kept current by the write handlers, so
+serving a range never scans the employees table.
+"""
+from flask import Blueprint, request, jsonify
+from collections import Counter
+from datetime import date, datetime
+from employees import require_auth, coalesced_response
+from logging_config import error_response
+import tenants
+
+# Create Blueprint
+timeseries_bp = Blueprint('timeseries', __name__, url_prefix='/api/employees/timeseries')
+
+GRANULARITIES = ('month', 'quarter', 'year')
+MAX_MONTHS = 600
+
+UPSERT_SQL = """
+    INSERT INTO employee_monthly_stats
+    (month, department_id, hires, exits, transfers_in, transfers_out)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        hires = hires + VALUES(hires),
+        exits = exits + VALUES(exits),
+        transfers_in = transfers_in + VALUES(transfers_in),
+        transfers_out = transfers_out + VALUES(transfers_out)
+"""
+
+
+def month_of(value):
+    """First day of the month of a date, datetime or 'YYYY-MM-DD' string"""
+    if value is None:
+        value = date.today()
+    elif isinstance(value, str):
+        value = datetime.strptime(value[:10], '%Y-%m-%d').date()
+    return date(value.year, value.month, 1)
+
+
+def _department(value):
+    # Employees without a department are bucketed under 0
+    return int(value) if value else 0
+
+# ============================================================
+# Incremental maintenance (call inside the write transaction)
+# ============================================================
+
+def _record(cursor, month, department_id, hires=0, exits=0, transfers_in=0, transfers_out=0):
+    cursor.execute(UPSERT_SQL, (
+        month, _department(department_id), hires, exits, transfers_in, transfers_out
+    ))
+
+
+def record_created(cursor, employee):
+    """Count a new employee: a hire in its join month, and an exit if created inactive"""
+    _record(cursor, month_of(employee.get('join_date')), employee['department_id'], hires=1)
+    if employee.get('status', 'active') != 'active':
+        _record(cursor, month_of(None), employee['department_id'], exits=1)
+
+
+def record_created_batch(cursor, employees):
+    """record_created for many employees with one batched upsert"""
+    buckets = Counter()
+    for employee in employees:
+        department_id = _department(employee['department_id'])
+        buckets[(month_of(employee.get('join_date')), department_id, 'hires')] += 1
+        if employee.get('status', 'active') != 'active':
+            buckets[(month_of(None), department_id, 'exits')] += 1
+
+    rows = [
+        (month, department_id,
+         count if kind == 'hires' else 0,
+         count if kind == 'exits' else 0,
+         0, 0)
+        for (month, department_id, kind), count in buckets.items()
+    ]
+    if rows:
+        cursor.executemany(UPSERT_SQL, rows)
+
+
+def record_updated(cursor, before, after):
+    """
+    Apply an employee update.
+    before: the row before the update (department_id, join_date, created_at, status)
+    after: the same fields with the update applied
+    """
+    old_department = before['department_id']
+    new_department = after['department_id']
+    was_active = before['status'] == 'active'
+    is_active = after['status'] == 'active'
+
+    old_hire = month_of(before['join_date'] or before['created_at'])
+    new_hire = month_of(after['join_date'] or before['created_at'])
+    if old_hire != new_hire:
+        _record(cursor, old_hire, old_department, hires=-1)
+        _record(cursor, new_hire, old_department, hires=1)
+
+    this_month = month_of(None)
+    if was_active and not is_active:
+        _record(cursor, this_month, old_department, exits=1)
+    elif is_active and not was_active:
+        # Reactivation counts as a rehire
+        _record(cursor, this_month, old_department, hires=1)
+
+    if is_active and _department(old_department) != _department(new_department):
+        _record(cursor, this_month, old_department, transfers_out=1)
+        _record(cursor, this_month, new_department, transfers_in=1)
+
+
+def record_deactivated(cursor, employee):
+    """Count an exit this month for an employee being deactivated"""
+    _record(cursor, month_of(None), employee['department_id'], exits=1)
+
+# ============================================================
+# Full rebuild
+# ============================================================
+
+def rebuild_buckets(tenant=None):
+    """
+    Recompute all of a tenant's buckets from the current employee rows.
+
+    Hires come from join_date (created_at when missing); exits are taken
+    from the month an inactive employee was last updated. Department
+    transfers cannot be reconstructed, so every employee counts toward
+    their current department.
+    """
+    from app import get_db_connection
+
+    conn = get_db_connection(tenant=tenant)
+    if not conn:
+        raise RuntimeError('Database connection failed')
+
+    employees = """
+        SELECT join_date, created_at, updated_at, department_id, status FROM employees
+        UNION ALL
+        SELECT join_date, created_at, updated_at, department_id, status FROM employees_archive
+    """
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM employee_monthly_stats")
+        cursor.execute(f"""
+            INSERT INTO employee_monthly_stats (month, department_id, hires)
+            SELECT DATE_FORMAT(COALESCE(join_date, created_at), '%Y-%m-01'),
+                COALESCE(department_id, 0), COUNT(*)
+            FROM ({employees}) e
+            GROUP BY 1, 2
+        """)
+        cursor.execute(f"""
+            INSERT INTO employee_monthly_stats (month, department_id, exits)
+            SELECT DATE_FORMAT(COALESCE(updated_at, created_at), '%Y-%m-01') AS m,
+                COALESCE(department_id, 0) AS dept, COUNT(*) AS n
+            FROM ({employees}) e
+            WHERE status = 'inactive'
+            GROUP BY 1, 2
+            ON DUPLICATE KEY UPDATE exits = VALUES(exits)
+        """)
+        cursor.execute("SELECT COUNT(*) as buckets FROM employee_monthly_stats")
+        buckets = cursor.fetchone()['buckets']
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    return buckets
+
+# ============================================================
+# Query
+# ============================================================
+
+def _parse_month(value, name):
+    try:
+        return datetime.strptime(value, '%Y-%m').date()
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} must be in YYYY-MM format')
+
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _period(month, granularity):
+    if granularity == 'year':
+        return str(month.year)
+    if granularity == 'quarter':
+        return f'{month.year}-Q{(month.month - 1) // 3 + 1}'
+    return month.strftime('%Y-%m')
+
+
+def _series(months, buckets, opening, granularity):
+    """Fold monthly buckets into periods with an end-of-period headcount"""
+    series = []
+    headcount = opening
+    for month in months:
+        hires, exits, transfers_in, transfers_out = buckets.get(month, (0, 0, 0, 0))
+        headcount += hires - exits + transfers_in - transfers_out
+        label = _period(month, granularity)
+        if not series or series[-1]['period'] != label:
+            series.append({
+                'period': label, 'hires': 0, 'exits': 0,
+                'transfers_in': 0, 'transfers_out': 0, 'headcount': 0
+            })
+        point = series[-1]
+        point['hires'] += hires
+        point['exits'] += exits
+        point['transfers_in'] += transfers_in
+        point['transfers_out'] += transfers_out
+        point['headcount'] = headcount
+    return series
+
+
+def _load_timeseries(start, end, granularity, department_id, by_department):
+    from app import get_db_connection
+
+    conn = get_db_connection(readonly=True)
+    try:
+        cursor = conn.cursor()
+
+        where = ""
+        params = []
+        if department_id:
+            where = " AND department_id = %s"
+            params.append(department_id)
+
+        cursor.execute(f"""
+            SELECT department_id,
+                SUM(hires - exits + transfers_in - transfers_out) as headcount
+            FROM employee_monthly_stats
+            WHERE month < %s{where}
+            GROUP BY department_id
+        """, [start] + params)
+        opening = {row['department_id']: int(row['headcount']) for row in cursor.fetchall()}
+
+        cursor.execute(f"""
+            SELECT month, department_id, hires, exits, transfers_in, transfers_out
+            FROM employee_monthly_stats
+            WHERE month BETWEEN %s AND %s{where}
+        """, [start, end] + params)
+        rows = cursor.fetchall()
+
+        names = {}
+        if by_department:
+            cursor.execute("SELECT id, name FROM departments")
+            names = {row['id']: row['name'] for row in cursor.fetchall()}
+    finally:
+        conn.close()
+
+    months = []
+    month = start
+    while month <= end:
+        months.append(month)
+        month = _add_months(month, 1)
+
+    def buckets_for(departments):
+        buckets = {}
+        for row in rows:
+            if row['department_id'] in departments:
+                totals = buckets.get(row['month'], (0, 0, 0, 0))
+                buckets[row['month']] = tuple(a + b for a, b in zip(totals, (
+                    row['hires'], row['exits'], row['transfers_in'], row['transfers_out']
+                )))
+        return buckets
+
+    result = {
+        'status': 'success',
+        'granularity': granularity,
+        'from': start.strftime('%Y-%m'),
+        'to': end.strftime('%Y-%m')
+    }
+
+    departments = set(opening) | {row['department_id'] for row in rows}
+    if by_department:
+        result['departments'] = [
+            {
+                'department_id': dept or None,
+                'department_name': names.get(dept),
+                'series': _series(months, buckets_for({dept}), opening.get(dept, 0), granularity)
+            }
+            for dept in sorted(departments)
+        ]
+    else:
+        result['series'] = _series(
+            months, buckets_for(departments), sum(opening.values()), granularity
+        )
+    return result
+
+# ============================================================
+# Routes
+# ============================================================
+
+@timeseries_bp.route('', methods=['GET'])
+@require_auth
+def get_timeseries():
+    """
+    Hires, exits and headcount over time
+    GET /api/employees/timeseries?from=2022-01&to=2024-12&granularity=quarter
+        &department_id=1&by_department=true
+    """
+    try:
+        granularity = request.args.get('granularity', 'month')
+        if granularity not in GRANULARITIES:
+            return jsonify({
+                'status': 'error',
+                'message': f'granularity must be one of: {", ".join(GRANULARITIES)}'
+            }), 400
+
+        try:
+            end = _parse_month(request.args['to'], 'to') if request.args.get('to') \
+                else month_of(None)
+            start = _parse_month(request.args['from'], 'from') if request.args.get('from') \
+                else _add_months(end, -11)
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 400
+
+        months = (end.year - start.year) * 12 + end.month - start.month + 1
+        if months < 1 or months > MAX_MONTHS:
+            return jsonify({
+                'status': 'error',
+                'message': f'Range must cover between 1 and {MAX_MONTHS} months'
+            }), 400
+
+        department_id = request.args.get('department_id', type=int)
+        by_department = request.args.get('by_department', '').lower() in ('1', 'true', 'yes')
+
+        return coalesced_response(
+            lambda: _load_timeseries(start, end, granularity, department_id, by_department),
+            (start, end, granularity, department_id, by_department)
+        )
+
+    except Exception as e:
+        return error_response(e)
+
+@timeseries_bp.route('/rebuild', methods=['POST'])
+@require_auth
+def rebuild():
+    """
+    Recompute all monthly buckets from the employees tables
+    POST /api/employees/timeseries/rebuild
+    """
+    try:
+        buckets = rebuild_buckets()
+        return jsonify({
+            'status': 'success',
+            'message': 'Time series rebuilt',
+            'buckets': buckets
+        }), 200
+
+    except Exception as e:
+        return error_response(e)
+
+
+if __name__ == '__main__':
+    for tenant in tenants.all_tenants():
+        print(f"{tenant}: rebuilt {rebuild_buckets(tenant=tenant)} monthly buckets")
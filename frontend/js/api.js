@@ -20,6 +20,7 @@ class API {
     // Remove auth token
     removeToken() {
         localStorage.removeItem('token');
+        localStorage.removeItem('lastWrite');
     }
 
     // Get headers with auth token
@@ -33,6 +34,13 @@ class API {
             if (token) {
                 headers['Authorization'] = `Bearer ${token}`;
             }
+
+            // Lets any server process keep our reads on the primary
+            // until our last write has reached the replicas
+            const lastWrite = localStorage.getItem('lastWrite');
+            if (lastWrite) {
+                headers['X-Last-Write'] = lastWrite;
+            }
         }
 
         return headers;
@@ -47,6 +55,11 @@ class API {
                 headers: this.getHeaders(options.includeAuth !== false)
             });
 
+            const lastWrite = response.headers.get('X-Last-Write');
+            if (lastWrite) {
+                localStorage.setItem('lastWrite', lastWrite);
+            }
+
             const data = await response.json();
 
             if (!response.ok) {
@@ -61,10 +74,11 @@ class API {
     }
 
     // Auth APIs
-    async login(username, password) {
+    async login(username, password, tenant = null) {
+        const credentials = tenant ? { username, password, tenant } : { username, password };
         return this.request('/api/auth/login', {
             method: 'POST',
-            body: JSON.stringify({ username, password }),
+            body: JSON.stringify(credentials),
             includeAuth: false
         });
     }
@@ -84,6 +98,16 @@ class API {
         });
     }
 
+    // Employees changed since a sync cursor ({updated_since, after_id}), as columns + rows
+    async getEmployeeChanges(cursor = {}) {
+        const params = new URLSearchParams({ format: 'columnar' });
+        if (cursor.updated_since) params.set('updated_since', cursor.updated_since);
+        if (cursor.after_id) params.set('after_id', cursor.after_id);
+        return this.request(`/api/employees/changes?${params.toString()}`, {
+            method: 'GET'
+        });
+    }
+
     async getEmployee(id) {
         return this.request(`/api/employees/${id}`, {
             method: 'GET'
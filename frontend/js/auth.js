@@ -33,7 +33,9 @@ document.addEventListener("DOMContentLoaded", function() {
             hideAlert();
             
             try {
-                const response = await api.login(username, password);
+                // Multi-tenant deployments link to login.html?tenant=<id>
+                const tenant = new URLSearchParams(window.location.search).get("tenant");
+                const response = await api.login(username, password, tenant);
                 
                 if (response.status === "success") {
                     api.setToken(response.token);
@@ -90,6 +92,8 @@ function isAuthenticated() {
 }
 
 function logout() {
+    // Don't leave the employee list on a shared machine
+    if (typeof employeeStore !== "undefined") employeeStore.destroy();
     api.removeToken();
     localStorage.removeItem("user");
     window.location.href = "login.html";
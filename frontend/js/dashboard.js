@@ -51,69 +51,115 @@ async function loadStats() {
 // ==============================
 // Load Employees
 // ==============================
+// Shows the offline copy at once, then syncs changes from the server
+let storeReady = null;
+
 async function loadEmployees() {
     const loading = document.getElementById('loading');
-    const emptyState = document.getElementById('emptyState');
-    const tableContainer = document.querySelector('.table-container');
-    const tbody = document.getElementById('employeesBody');
 
-    // Show loading
-    loading.classList.remove('hidden');
-    tableContainer.classList.add('hidden');
-    emptyState.classList.add('hidden');
+    if (!storeReady) storeReady = employeeStore.open();
+    await storeReady;
+
+    const hasCache = employeeStore.size > 0;
+    if (hasCache) {
+        renderEmployees();
+    } else {
+        loading.classList.remove('hidden');
+        document.querySelector('.table-container').classList.add('hidden');
+        document.getElementById('emptyState').classList.add('hidden');
+    }
 
     try {
-        // Get filter values
-        const status = document.getElementById('statusFilter')?.value;
-        const search = document.getElementById('searchInput')?.value;
+        await employeeStore.sync();
+    } catch (error) {
+        console.error('Error syncing employees:', error);
+        if (hasCache) {
+            showAlert('Offline: showing saved employees', 'info');
+        } else {
+            showAlert('Failed to load employees: ' + error.message, 'error');
+        }
+    }
 
-        const filters = {};
-        if (status) filters.status = status;
-        if (search) filters.search = search;
+    loading.classList.add('hidden');
+    renderEmployees();
+}
 
-        const response = await api.getEmployees(filters);
+// ==============================
+// Filter Locally
+// ==============================
+let visibleEmployees = [];
+
+function renderEmployees() {
+    const emptyState = document.getElementById('emptyState');
+    const tableContainer = document.querySelector('.table-container');
 
-        // Hide loading
-        loading.classList.add('hidden');
+    const status = document.getElementById('statusFilter')?.value || '';
+    const search = document.getElementById('searchInput')?.value || '';
+    visibleEmployees = employeeStore.query({ status, search });
 
-        if (response.status === 'success') {
-            const employees = response.employees;
-
-            if (employees.length === 0) {
-                emptyState.classList.remove('hidden');
-            } else {
-                tableContainer.classList.remove('hidden');
-                displayEmployees(employees);
-            }
-        } else {
-            showAlert('Failed to load employees', 'error');
-        }
-    } catch (error) {
-        console.error('Error loading employees:', error);
-        loading.classList.add('hidden');
-        showAlert('Failed to load employees: ' + error.message, 'error');
+    if (visibleEmployees.length === 0) {
+        tableContainer.classList.add('hidden');
+        emptyState.classList.remove('hidden');
+        return;
     }
+
+    emptyState.classList.add('hidden');
+    tableContainer.classList.remove('hidden');
+    renderVisibleRows();
 }
 
 // ==============================
-// Display Employees in Table
+// Virtualized Table
 // ==============================
-function displayEmployees(employees) {
+// Only the rows in view (plus a margin) are in the DOM; spacer rows keep
+// the scrollbar sized for the full list.
+const OVERSCAN_ROWS = 10;
+let rowHeight = 49;
+let scrollFrame = null;
+
+function renderVisibleRows() {
+    const container = document.querySelector('.table-container');
     const tbody = document.getElementById('employeesBody');
-    tbody.innerHTML = '';
-
-    employees.forEach(emp => {
-        const row = document.createElement('tr');
-        row.innerHTML = `
-            <td><strong>${emp.id}</strong></td>
-            <td>${emp.name}</td>
-            <td>${emp.email}</td>
-            <td>${emp.position}</td>
-            <td>Rs ${emp.salary}</td>
-            <td>${emp.joinedDate}</td>
+    const total = visibleEmployees.length;
+
+    const first = Math.min(
+        Math.max(0, Math.floor(container.scrollTop / rowHeight) - OVERSCAN_ROWS),
+        Math.max(0, total - 1)
+    );
+    const last = Math.min(total, first + Math.ceil(container.clientHeight / rowHeight) + 2 * OVERSCAN_ROWS);
+
+    const rows = [spacerRow(first * rowHeight)];
+    for (let i = first; i < last; i++) {
+        rows.push(employeeRow(visibleEmployees[i]));
+    }
+    rows.push(spacerRow((total - last) * rowHeight));
+    tbody.innerHTML = rows.join('');
+
+    // Use the real row height once rows are on screen
+    const rendered = tbody.rows[1];
+    if (rendered && rendered.offsetHeight && rendered.offsetHeight !== rowHeight) {
+        rowHeight = rendered.offsetHeight;
+        renderVisibleRows();
+    }
+}
+
+function spacerRow(height) {
+    return `<tr class="spacer-row" style="height: ${height}px"><td colspan="8"></td></tr>`;
+}
+
+function employeeRow(emp) {
+    const status = escapeHtml(emp.status || '');
+    return `
+        <tr>
+            <td><strong>${escapeHtml(emp.name)}</strong></td>
+            <td>${escapeHtml(emp.email)}</td>
+            <td>${escapeHtml(emp.phone || '-')}</td>
+            <td>${escapeHtml(emp.department_name || '-')}</td>
+            <td>${emp.salary ? 'Rs ' + escapeHtml(emp.salary) : '-'}</td>
+            <td>${escapeHtml(emp.join_date || '-')}</td>
             <td>
-                <span class="status-badge status-${emp.status.toLowerCase()}">
-                    ${emp.status}
+                <span class="status-badge status-${status.toLowerCase()}">
+                    ${status}
                 </span>
             </td>
             <td>
@@ -124,26 +170,51 @@ function displayEmployees(employees) {
                     Delete
                 </button>
             </td>
-        `;
-        tbody.appendChild(row);
-    });
+        </tr>
+    `;
+}
+
+function escapeHtml(value) {
+    return String(value)
+        .replace(/&/g, '&amp;')
+        .replace(/</g, '&lt;')
+        .replace(/>/g, '&gt;')
+        .replace(/"/g, '&quot;');
 }
 
 // ==============================
 // Event Listeners
 // ==============================
 function setupEventListeners() {
-    // Search input
+    // Search input (filters the local copy, no request)
     const searchInput = document.getElementById('searchInput');
     if (searchInput) {
-        searchInput.addEventListener('input', debounce(loadEmployees, 500));
+        searchInput.addEventListener('input', debounce(resetScrollAndRender, 150));
     }
 
     // Status filter
     const statusFilter = document.getElementById('statusFilter');
     if (statusFilter) {
-        statusFilter.addEventListener('change', loadEmployees);
+        statusFilter.addEventListener('change', resetScrollAndRender);
     }
+
+    // Re-render the visible window while scrolling, once per frame
+    const tableContainer = document.querySelector('.table-container');
+    tableContainer.addEventListener('scroll', function () {
+        if (scrollFrame) return;
+        scrollFrame = requestAnimationFrame(() => {
+            scrollFrame = null;
+            renderVisibleRows();
+        });
+    });
+
+    // Pick up changes made elsewhere when coming back online
+    window.addEventListener('online', loadEmployees);
+}
+
+function resetScrollAndRender() {
+    document.querySelector('.table-container').scrollTop = 0;
+    renderEmployees();
 }
 
 // ==============================
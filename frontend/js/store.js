@@ -0,0 +1,143 @@
+// ==============================
+// Offline Employee Store
+// ==============================
+// Keeps a copy of the tenant's employees in IndexedDB so the dashboard
+// renders instantly and keeps working offline. Filtering and search run
+// in memory; sync() fetches only the rows changed since the last sync
+// from /api/employees/changes.
+
+const STORE_VERSION = 1;
+
+class EmployeeStore {
+    constructor() {
+        this.db = null;
+        this.employees = new Map();   // id -> employee
+        this.sorted = null;           // employees in display order, rebuilt after changes
+        this.cursor = {};             // {updated_since, after_id} for the next sync
+        this.syncing = null;
+    }
+
+    get size() {
+        return this.employees.size;
+    }
+
+    // One cache per tenant
+    dbName() {
+        const user = JSON.parse(localStorage.getItem('user') || '{}');
+        return `ems-employees-${user.tenant || 'default'}`;
+    }
+
+    // Load the cached employees; without IndexedDB the store works in memory only
+    async open() {
+        if (!window.indexedDB) return;
+
+        try {
+            this.db = await new Promise((resolve, reject) => {
+                const request = indexedDB.open(this.dbName(), STORE_VERSION);
+                request.onupgradeneeded = () => {
+                    request.result.createObjectStore('employees', { keyPath: 'id' });
+                    request.result.createObjectStore('meta');
+                };
+                request.onsuccess = () => resolve(request.result);
+                request.onerror = () => reject(request.error);
+            });
+
+            const tx = this.db.transaction(['employees', 'meta'], 'readonly');
+            const [rows, cursor] = await Promise.all([
+                promisify(tx.objectStore('employees').getAll()),
+                promisify(tx.objectStore('meta').get('cursor'))
+            ]);
+            rows.forEach(emp => this.employees.set(emp.id, emp));
+            this.cursor = cursor || {};
+            this.sorted = null;
+        } catch (error) {
+            console.warn('IndexedDB unavailable, caching in memory only:', error);
+            this.db = null;
+        }
+    }
+
+    // Pull changes from the server; concurrent calls share one sync
+    sync() {
+        if (!this.syncing) {
+            this.syncing = this._sync().finally(() => {
+                this.syncing = null;
+            });
+        }
+        return this.syncing;
+    }
+
+    async _sync() {
+        let hasMore = true;
+        while (hasMore) {
+            const response = await api.getEmployeeChanges(this.cursor);
+            const rows = response.rows.map(row => toEmployee(response.columns, row));
+
+            rows.forEach(emp => this.employees.set(emp.id, emp));
+            if (rows.length) this.sorted = null;
+            this.cursor = response.next;
+            await this._save(rows, this.cursor);
+
+            hasMore = response.has_more;
+        }
+    }
+
+    // A page of rows and the cursor after it are stored together
+    _save(rows, cursor) {
+        if (!this.db) return Promise.resolve();
+
+        return new Promise((resolve, reject) => {
+            const tx = this.db.transaction(['employees', 'meta'], 'readwrite');
+            const store = tx.objectStore('employees');
+            rows.forEach(emp => store.put(emp));
+            tx.objectStore('meta').put(cursor, 'cursor');
+            tx.oncomplete = () => resolve();
+            tx.onerror = () => reject(tx.error);
+        });
+    }
+
+    // Employees matching the filters, newest first (the server's default order)
+    query({ status = '', search = '' } = {}) {
+        if (!this.sorted) {
+            this.sorted = Array.from(this.employees.values()).sort((a, b) =>
+                (b.created_at || '').localeCompare(a.created_at || '') || b.id - a.id
+            );
+        }
+
+        const term = search.trim().toLowerCase();
+        if (!status && !term) return this.sorted;
+
+        return this.sorted.filter(emp =>
+            (!status || emp.status === status) &&
+            (!term || emp.name.toLowerCase().includes(term) || emp.email.toLowerCase().includes(term))
+        );
+    }
+
+    // Remove the cached data (on logout)
+    destroy() {
+        if (this.db) this.db.close();
+        this.db = null;
+        this.employees.clear();
+        this.sorted = null;
+        this.cursor = {};
+        if (window.indexedDB) indexedDB.deleteDatabase(this.dbName());
+    }
+}
+
+function promisify(request) {
+    return new Promise((resolve, reject) => {
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+// Columnar row -> employee object
+function toEmployee(columns, row) {
+    const emp = {};
+    columns.forEach((column, i) => {
+        emp[column] = row[i];
+    });
+    return emp;
+}
+
+// Create global store instance
+const employeeStore = new EmployeeStore();